@@ -0,0 +1,300 @@
+"""
+專訪文章生成服務（HTTP）
+
+以單一 event loop 多工處理多篇生成，供內部工作排程系統呼叫。
+
+啟動：
+    python -m app.service --port 8600 --concurrency 8
+
+端點：
+    POST /generate               建立生成工作，回傳 job_id
+    GET  /status/<job_id>        查詢工作狀態與品質檢查結果
+    GET  /export/<job_id>?format=md|txt|docx|json   匯出文章
+"""
+
+import sys
+import os
+import json
+import uuid
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import tornado.web
+from engine.async_generator import agenerate_article
+from engine.generator import CASCADE_ALIAS, MODEL_ALIAS, TEMPLATE_MODE_COMPACT, TEMPLATE_MODE_VERBOSE
+from engine.cache import ResponseCache
+from engine.store import ArticleStore
+from engine.postprocess import build_docx_from_markdown, build_plain_text, build_meta_json
+
+# === 常數定義 ===
+DEFAULT_PORT = 8600
+DEFAULT_ADDRESS = "127.0.0.1"   # 服務沒有驗證且使用伺服器的 API Key，預設只接受本機連線
+DEFAULT_CONCURRENCY = 8
+MAX_JOBS = 1000
+
+REQUIRED_FIELDS = ["subject", "company", "participants", "transcript"]
+OPTIONAL_FIELDS = {
+    "summary_points": "",
+    "opening_style": "場景式",
+    "opening_context": "",
+    "paragraphs": 5,
+    "model": "正式生成",
+    "max_tokens": None,
+    "template_mode": "verbose",
+    "dedupe": False,
+    "fix_terms": False,
+}
+TEXT_FIELDS = ["summary_points", "opening_style", "opening_context"]
+BOOL_FIELDS = ["dedupe", "fix_terms"]
+PARAGRAPH_RANGE = (3, 8)        # 與介面的段落數滑桿相同
+MODEL_CHOICES = [*MODEL_ALIAS, CASCADE_ALIAS]
+TEMPLATE_MODES = [TEMPLATE_MODE_VERBOSE, TEMPLATE_MODE_COMPACT]
+
+EXPORT_FORMATS = {
+    "md": "text/markdown; charset=utf-8",
+    "txt": "text/plain; charset=utf-8",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "json": "application/json; charset=utf-8",
+}
+
+
+def parse_params(body: dict) -> dict:
+    """
+    檢查並整理生成參數（欄位型別錯誤時拋出 ValueError，由呼叫端回傳 400）
+
+    - 文字欄位須為字串；paragraphs／max_tokens 接受整數或純數字字串
+    - model、template_mode 須為支援的選項；dedupe、fix_terms 須為 JSON 布林值
+    """
+    missing = [f for f in REQUIRED_FIELDS if not body.get(f)]
+    if missing:
+        raise ValueError(f"缺少必填欄位：{', '.join(missing)}")
+
+    params = {f: body[f] for f in REQUIRED_FIELDS}
+    params.update({f: body.get(f, default) for f, default in OPTIONAL_FIELDS.items()})
+    for field in [*REQUIRED_FIELDS, *TEXT_FIELDS]:
+        if not isinstance(params[field], str):
+            raise ValueError(f"{field} 必須為字串")
+    for field in BOOL_FIELDS:
+        if not isinstance(params[field], bool):
+            raise ValueError(f"{field} 必須為 true 或 false")
+
+    params["paragraphs"] = _parse_int(params["paragraphs"], "paragraphs")
+    low, high = PARAGRAPH_RANGE
+    if not low <= params["paragraphs"] <= high:
+        raise ValueError(f"paragraphs 必須介於 {low}–{high}")
+    if params["max_tokens"] is not None:
+        params["max_tokens"] = _parse_int(params["max_tokens"], "max_tokens")
+        if params["max_tokens"] <= 0:
+            raise ValueError("max_tokens 必須為正整數")
+    if params["model"] not in MODEL_CHOICES:
+        raise ValueError(f"不支援的模型：{params['model']}（支援 {', '.join(MODEL_CHOICES)}）")
+    if params["template_mode"] not in TEMPLATE_MODES:
+        raise ValueError(f"template_mode 必須為 {' 或 '.join(TEMPLATE_MODES)}")
+    return params
+
+
+def _parse_int(value, field: str) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"{field} 必須為整數")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    raise ValueError(f"{field} 必須為整數")
+
+
+class JobManager:
+    """
+    生成工作管理
+
+    - 以 Semaphore 限制同時呼叫 API 的工作數，其餘排隊等待
+    - 僅保留最近 MAX_JOBS 筆工作，避免記憶體無限成長（只淘汰已結束的工作）
+    """
+
+    def __init__(self, concurrency: int, api_key: str, cache: ResponseCache | None = None,
+                 store: ArticleStore | None = None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.api_key = api_key
+        self.cache = cache
+        self.store = store
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()    # event loop 只保留弱參照，需自行持有
+
+    def submit(self, params: dict, api_key: str = "") -> str:
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "status": "queued",
+            "params": params,
+            "created_at": time.time(),
+        }
+        self._evict()
+        task = asyncio.get_running_loop().create_task(self._run(job_id, api_key or self.api_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def _evict(self) -> None:
+        """由舊到新淘汰已結束的工作；排隊或執行中的工作一律保留"""
+        excess = len(self.jobs) - MAX_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "error")]
+        for job_id in finished[:excess]:
+            del self.jobs[job_id]
+
+    async def _run(self, job_id: str, api_key: str) -> None:
+        job = self.jobs[job_id]
+        params = job["params"]
+        async with self.semaphore:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                article, checks, attempt = await agenerate_article(
+                    **params, api_key=api_key, cache=self.cache, store=self.store
+                )
+                job.update(status="done", article=article, checks=checks, attempt=attempt)
+            except Exception as e:
+                job.update(status="error", error=str(e))
+            finally:
+                job["finished_at"] = time.time()
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    @property
+    def manager(self) -> JobManager:
+        return self.application.settings["manager"]
+
+    def write_json(self, data: dict, status: int = 200) -> None:
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(data, ensure_ascii=False))
+
+    def get_job(self, job_id: str) -> dict | None:
+        job = self.manager.jobs.get(job_id)
+        if job is None:
+            self.write_json({"error": f"找不到工作：{job_id}"}, 404)
+        return job
+
+
+class GenerateHandler(BaseHandler):
+    def post(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            return self.write_json({"error": "請求內容必須為 JSON"}, 400)
+
+        if not isinstance(body, dict):
+            return self.write_json({"error": "請求內容必須為 JSON 物件"}, 400)
+        try:
+            params = parse_params(body)
+        except ValueError as e:
+            return self.write_json({"error": str(e)}, 400)
+        if not isinstance(body.get("api_key", ""), str):
+            return self.write_json({"error": "api_key 必須為字串"}, 400)
+        if not (body.get("api_key") or self.manager.api_key):
+            return self.write_json({"error": "未提供 API Key"}, 400)
+
+        job_id = self.manager.submit(params, body.get("api_key", ""))
+        self.write_json({"job_id": job_id, "status": "queued"}, 202)
+
+
+class StatusHandler(BaseHandler):
+    def get(self, job_id: str):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        result = {
+            "job_id": job_id,
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at"),
+        }
+        if job["status"] == "done":
+            result.update(checks=job["checks"], attempt=job["attempt"])
+        elif job["status"] == "error":
+            result["error"] = job["error"]
+        self.write_json(result)
+
+
+class ExportHandler(BaseHandler):
+    async def get(self, job_id: str):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        if job["status"] != "done":
+            return self.write_json({"error": f"工作尚未完成（{job['status']}）"}, 409)
+
+        fmt = self.get_argument("format", "md")
+        if fmt not in EXPORT_FORMATS:
+            return self.write_json({"error": f"不支援的格式：{fmt}"}, 400)
+
+        params, article = job["params"], job["article"]
+        if fmt == "md":
+            data = article.encode("utf-8")
+        elif fmt == "txt":
+            data = build_plain_text(article).encode("utf-8")
+        elif fmt == "docx":
+            # DOCX 組裝為 CPU 工作，移至執行緒避免阻塞 event loop
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, build_docx_from_markdown, article
+            )
+        else:
+            data = build_meta_json(
+                subject=params["subject"],
+                company=params["company"],
+                people="",
+                participants=params["participants"],
+                article_md=article,
+                checks=job["checks"],
+                retries=job["attempt"],
+                paragraphs=params["paragraphs"],
+            )
+
+        self.set_header("Content-Type", EXPORT_FORMATS[fmt])
+        self.set_header("Content-Disposition", f'attachment; filename="{job_id}.{fmt}"')
+        self.finish(data)
+
+
+def make_app(concurrency: int = DEFAULT_CONCURRENCY, api_key: str = "",
+             cache: ResponseCache | None = None,
+             store: ArticleStore | None = None) -> tornado.web.Application:
+    manager = JobManager(concurrency, api_key, cache, store)
+    return tornado.web.Application(
+        [
+            (r"/generate", GenerateHandler),
+            (r"/status/([0-9a-f]+)", StatusHandler),
+            (r"/export/([0-9a-f]+)", ExportHandler),
+        ],
+        manager=manager,
+    )
+
+
+async def main(port: int, concurrency: int, use_cache: bool, use_store: bool,
+               address: str = DEFAULT_ADDRESS) -> None:
+    app = make_app(
+        concurrency=concurrency,
+        api_key=os.environ.get("OPENAI_API_KEY", ""),
+        cache=ResponseCache() if use_cache else None,
+        store=ArticleStore() if use_store else None,
+    )
+    app.listen(port, address=address)
+    print(f"🚀 生成服務啟動：http://{address}:{port}（同時生成上限 {concurrency}）")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="專訪文章生成 HTTP 服務")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--address", default=DEFAULT_ADDRESS,
+                        help="監聽位址（預設僅本機；服務沒有驗證，開放前請自行加上防護）")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--cache", action="store_true", help="啟用回應快取")
+    parser.add_argument("--store", action="store_true", help="生成後保存至文章庫（data/articles.db）")
+    args = parser.parse_args()
+    asyncio.run(main(args.port, args.concurrency, args.cache, args.store, args.address))
@@ -6,10 +6,21 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import streamlit as st
-from engine.generator import generate_article
-from engine.postprocess import build_docx_from_markdown  # ✅ 新增匯入
-from datetime import datetime
+from engine.generator import (
+    generate_article, participant_names, plan_article, regenerate_section, repair_article,
+)
+from engine.sections import split_sections
+from engine.planner import MODE_LABELS
+from engine.cache import ResponseCache
+from engine.store import ArticleStore
+from engine.bundle import MAX_UI_BUNDLE_ARTICLES, export_bundle, items_from_store
+from engine.ingest import TranscriptFile
+from engine.hedging import DEFAULT_HEDGE_POLICY
+from engine.editor import BlockAnalyzer, join_blocks, split_blocks
+from engine.lexicon import CATEGORY_BANNED, CATEGORY_FILLER
+from datetime import datetime, timedelta
 import json
+import tempfile
 
 # === 頁面設定 ===
 st.set_page_config(
@@ -19,6 +30,19 @@ st.set_page_config(
 )
 
 # === 輔助函數 ===
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
+
+@st.cache_resource
+def get_article_store() -> ArticleStore:
+    return ArticleStore()
+
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs={TranscriptFile: TranscriptFile.digest})
+def get_generation_plan(*args, **kwargs) -> dict:
+    # 編輯器每次輸入、切換分頁都會重新執行腳本；輸入未變時直接沿用，不重新計算 tokens 與去重
+    return plan_article(*args, **kwargs)
+
 def validate_api_key(key: str) -> tuple[bool, str]:
     if not key:
         return False, "請輸入 API Key（sk-...）"
@@ -66,10 +90,26 @@ with st.sidebar:
     )
 
     transcript = st.text_area("逐字稿內容 *", height=300, placeholder="請貼上完整逐字稿（建議 2000–6000 字）")
+    uploaded_transcript = st.file_uploader(
+        "或上傳逐字稿檔案", type=["txt", "srt", "vtt", "docx"],
+        help="支援純文字、SRT／VTT 字幕與 Word 檔；上傳後將取代上方貼上的內容"
+    )
+    if uploaded_transcript is not None:
+        try:
+            # 不合併為完整文字：超長檔案在生成時逐行串流摘要
+            uploaded = TranscriptFile(uploaded_transcript, uploaded_transcript.name)
+            uploaded.char_count()
+            transcript = uploaded
+            st.caption(f"📄 已載入：{uploaded_transcript.name}")
+        except Exception as e:
+            st.error(f"❌ 檔案讀取失敗：{e}")
     if transcript:
-        word_count = len(transcript.replace(" ", "").replace("\n", ""))
+        if isinstance(transcript, TranscriptFile):
+            word_count = transcript.char_count()
+        else:
+            word_count = len(transcript.replace(" ", "").replace("\n", ""))
         if word_count > 8000:
-            st.warning("⚠️ 偵測到逐字稿超過 8000 字，將自動啟用【長逐字稿安全模式】。")
+            st.warning("⚠️ 偵測到逐字稿超過 8000 字，將依預算規劃改用摘錄或長逐字稿安全模式。")
         elif word_count < 2000:
             st.error(f"❌ 字數過少：目前 {word_count} 字，建議 2000 字以上。")
         else:
@@ -90,16 +130,116 @@ with st.sidebar:
     
     model_choice = st.selectbox(
         "AI 模型選擇",
-        ["快速測試", "正式生成"],
+        ["快速測試", "正式生成", "自動分級"],
         index=1,
         help="""
 - 快速測試（gpt-4o-mini）：適合功能測試、快速驗證，成本低、速度快
 - 正式生成（gpt-4o）：適合正式文章、長逐字稿處理，品質高、穩定可靠
+- 自動分級：先以 gpt-4o-mini 生成，未通過品質檢查才升級至 gpt-4o
         """
     )
 
+    dedupe = st.checkbox("🧹 移除重複段落", value=False,
+                         help="送出前移除逐字稿中重複敘述、複述與語音辨識重複的段落，保留第一次出現的原文")
+    compact_template = st.checkbox("🗜️ 精簡模板", value=False,
+                                   help="移除模板中的註解、分隔線與重複指示，減少每次請求的輸入 tokens")
+    use_cache = st.checkbox("⚡ 啟用回應快取", value=False,
+                            help="相同輸入直接回傳先前結果，不再呼叫 API")
+    bypass_cache = st.checkbox("🔄 略過快取（重新取樣）", value=False, disabled=not use_cache)
+
+    save_to_store = st.checkbox("🗄️ 保存至文章庫", value=True,
+                                help="生成後保存文章、meta 與執行紀錄，可於主畫面搜尋")
+
+    hedge = st.checkbox("🛡️ 對沖請求（降低長尾延遲）", value=False,
+                        help="主要請求逾時未回應時自動再發出一個請求，先通過品質檢查者勝出")
+    if hedge:
+        hedge_stats = DEFAULT_HEDGE_POLICY.stats()
+        st.caption(f"對沖觸發 {hedge_stats['hedges_fired']}／{hedge_stats['requests']} 次，"
+                   f"勝出 {hedge_stats['hedge_wins']} 次")
+    fix_terms = st.checkbox("🔤 自動替換大陸用語", value=False,
+                            help="生成後將互聯網、高質量、落地等用語替換為網路、高品質、實際導入")
+    auto_repair = st.checkbox("🩹 自動修補未通過項目", value=False,
+                              help="品質檢查未通過時，只改寫有問題的小節，不重新生成整篇")
+
+    # === 生成前預估 ===
+    if transcript:
+        try:
+            plan = get_generation_plan(
+                subject, company, participants, transcript, summary_points,
+                opening_style, opening_context, paragraphs,
+                model=model_choice,
+                template_mode="compact" if compact_template else "verbose",
+                dedupe=dedupe
+            )
+            with st.expander("📊 預估用量", expanded=True):
+                st.caption(f"處理模式：{MODE_LABELS[plan['mode']]}")
+                st.caption(f"輸入約 {plan['prompt_tokens']:,} tokens"
+                           f"（系統 {plan['system_tokens']:,}／模板 {plan['template_tokens']:,}／"
+                           f"逐字稿 {plan['transcript_tokens']:,}／其他 {plan['other_tokens']:,}）")
+                st.caption(f"max_tokens：{plan['max_tokens']:,}　預估成本：US$ {plan['estimated_cost']:.4f}"
+                           f"　預估耗時：約 {plan['estimated_latency']:.0f} 秒")
+        except Exception as e:
+            st.caption(f"無法預估用量：{e}")
+
     generate_btn = st.button("🚀 生成文章", use_container_width=True, type="primary")
 
+# === 文章庫搜尋 ===
+with st.expander("🔎 搜尋文章庫"):
+    col_query, col_company, col_days = st.columns([2, 1, 1])
+    store_query = col_query.text_input("關鍵字", placeholder="例：數位轉型 供應鏈")
+    store_company = col_company.text_input("企業／組織（完全相符）")
+    store_days = col_days.selectbox("期間", [0, 7, 30], format_func=lambda d: f"近 {d} 天" if d else "不限")
+    if store_query or store_company or store_days:
+        store_filters = {
+            "company": store_company or None,
+            "since": (datetime.now() - timedelta(days=store_days)).date().isoformat() if store_days else None,
+        }
+        hits = get_article_store().search(store_query, **store_filters)
+        st.caption(f"共 {len(hits)} 筆（由新到舊）")
+        if hits and st.button(f"📦 打包下載符合的文章（最近 {MAX_UI_BUNDLE_ARTICLES} 篇；Markdown／Word／TXT／meta.json）"):
+            store = get_article_store()
+            items = items_from_store(
+                store, store.search(store_query, limit=MAX_UI_BUNDLE_ARTICLES, **store_filters)
+            )
+            if len(items) == MAX_UI_BUNDLE_ARTICLES:
+                st.warning(f"⚠️ 只打包最近 {MAX_UI_BUNDLE_ARTICLES} 篇；更多文章請使用 python -m engine.bundle")
+            bundle_bar = st.progress(0.0, text=f"打包中…（0/{len(items)}）")
+            # ZIP 先串流寫入磁碟，不在記憶體中組裝；下載按鈕只會保留一份
+            with tempfile.TemporaryDirectory(prefix="bundle_") as bundle_dir:
+                bundle_path = Path(bundle_dir) / "articles.zip"
+                report = export_bundle(
+                    items, bundle_path,
+                    progress=lambda done, total: bundle_bar.progress(done / total, text=f"打包中…（{done}/{total}）"),
+                )
+                bundle_bar.empty()
+                st.success(f"✅ 已打包 {report['articles']} 篇、{report['files']} 個檔案（{report['seconds']} 秒）")
+                with open(bundle_path, "rb") as bundle_file:
+                    st.download_button(
+                        "📥 下載 ZIP",
+                        bundle_file,
+                        file_name=f"articles_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                        mime="application/zip",
+                    )
+        for hit in hits:
+            col_info, col_load = st.columns([5, 1])
+            col_info.markdown(f"**#{hit['id']}　{hit['company']}／{hit['subject']}**　"
+                              f"{hit['created_at']}　{hit['model']}")
+            col_info.caption(hit["snippet"])
+            if col_load.button("📂 載入", key=f"load_article_{hit['id']}"):
+                stored = get_article_store().get(hit["id"])
+                telemetry = dict(stored["telemetry"])
+                st.session_state["result"] = {
+                    "article": stored["article"],
+                    "checks": {**telemetry.pop("品質檢查", {}), **telemetry, "文章編號": stored["id"]},
+                    "subject": stored["subject"],
+                    "company": stored["company"],
+                    "participants": stored["meta"].get("participants", ""),
+                    "transcript": "",
+                    "paragraphs": stored["meta"].get("constraints", {}).get("min_paragraphs") or 5,
+                    "model": stored["model"],
+                }
+                st.rerun()
+
 # === 主畫面 ===
 if generate_btn:
     valid, msg = validate_required_fields(api_key, subject, company, participants, transcript)
@@ -123,77 +263,177 @@ if generate_btn:
             paragraphs=paragraphs,
             api_key=api_key,
             model=model_choice,
-            max_tokens=4000
+            cache=get_response_cache() if use_cache else None,
+            bypass_cache=bypass_cache,
+            hedge=hedge,
+            template_mode="compact" if compact_template else "verbose",
+            auto_repair=auto_repair,
+            dedupe=dedupe,
+            fix_terms=fix_terms,
+            store=get_article_store() if save_to_store else None
         )
 
         # ✅ 清除狀態訊息
         status_placeholder.empty()
         
+        st.session_state["result"] = {
+            "article": article,
+            "checks": checks,
+            "subject": subject,
+            "company": company,
+            "participants": participants,
+            "transcript": transcript,
+            "paragraphs": paragraphs,
+            "model": model_choice,
+        }
         st.balloons()
         st.success(f"✅ 生成完成！（重試 {retries} 次）")
         
-        # ✅ 修改：新增 4 個 tab，包含 Word 和 TXT 下載
-        tab1, tab2, tab3, tab4 = st.tabs(["📄 文章內容", "🔍 品質檢查", "💾 下載 Markdown", "📦 下載其他格式"])
-        
-        with tab1:
-            st.markdown(article)
-            wc = count_words(article)
-            actual_model = "gpt-4o-mini" if model_choice == "快速測試" else "gpt-4o"
-            st.caption(f"📝 字數：{wc['total']}　模型：{actual_model}")
+    except Exception as e:
+        status_placeholder.empty()  # ✅ 清除狀態訊息
+        error_msg = str(e)
+        if "模板載入失敗" in error_msg:
+            st.error("❌ 模板載入失敗，請確認 engine/templates/article_template.txt 是否存在且可讀取。")
+        elif "max_completion_tokens" in error_msg or "max_tokens" in error_msg:
+            st.error("⚠️ 參數錯誤：請更新 OpenAI 套件版本或確認模型支援。")
+        else:
+            st.error(f"❌ 生成失敗：{error_msg}")
+
+# === 生成結果（保留於工作階段，可逐段修訂） ===
+result = st.session_state.get("result")
+if result:
+    article, checks = result["article"], result["checks"]
+    if "analyzer" not in result:
+        result["analyzer"] = BlockAnalyzer(participant_names(result["participants"]))
+    analyzer = result["analyzer"]
+    blocks = split_blocks(article)
+
+    # ✅ 修改：新增段落修訂與編輯 tab
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["📄 文章內容", "🔍 品質檢查", "💾 下載 Markdown", "📦 下載其他格式", "🛠️ 段落修訂", "✏️ 編輯與分析"]
+    )
+    
+    with tab1:
+        st.markdown(article)
+        wc = count_words(article)
+        actual_model = checks.get("服務層級") or ("gpt-4o-mini" if result["model"] == "快速測試" else "gpt-4o")
+        st.caption(f"📝 字數：{wc['total']}　模型：{actual_model}")
+    
+    with tab2:
+        st.json(checks)
+    
+    with tab3:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename_base = f"{result['company']}_{result['subject']}_{timestamp}"
         
-        with tab2:
-            st.json(checks)
+        st.download_button(
+            "📥 下載 Markdown (.md)",
+            data=article,
+            file_name=f"{filename_base}.md",
+            mime="text/markdown",
+            use_container_width=True
+        )
+    
+    with tab4:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename_base = f"{result['company']}_{result['subject']}_{timestamp}"
         
-        with tab3:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename_base = f"{company}_{subject}_{timestamp}"
-            
+        # ✅ Word 下載
+        st.subheader("📄 Microsoft Word")
+        try:
+            docx_data = analyzer.export_docx(blocks)
             st.download_button(
-                "📥 下載 Markdown (.md)",
-                data=article,
-                file_name=f"{filename_base}.md",
-                mime="text/markdown",
+                "📥 下載 Word (.docx)",
+                data=docx_data,
+                file_name=f"{filename_base}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                 use_container_width=True
             )
+        except Exception as e:
+            st.error(f"Word 檔案生成失敗：{e}")
+        
+        st.divider()
         
-        with tab4:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename_base = f"{company}_{subject}_{timestamp}"
-            
-            # ✅ Word 下載
-            st.subheader("📄 Microsoft Word")
+        # ✅ 純文字下載
+        st.subheader("📝 純文字檔")
+        plain_text = analyzer.export_plain_text(blocks)
+        st.download_button(
+            "📥 下載純文字 (.txt)",
+            data=plain_text,
+            file_name=f"{filename_base}.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+    with tab5:
+        sections = split_sections(article)
+        section_index = st.selectbox(
+            "選擇小節", range(len(sections)),
+            format_func=lambda i: sections[i]["heading"][3:] if sections[i]["heading"] else "（開場）"
+        )
+        instruction = st.text_input("修改指示（選填）", placeholder="例：補充具體數據，語氣更溫暖")
+        failed = [name for name, passed in checks.items() if passed is False]
+        # 自文章庫載入的文章沒有逐字稿，改寫時引言會失去依據
+        has_transcript = bool(result["transcript"])
+        if not has_transcript:
+            st.info("ℹ️ 此文章自文章庫載入，沒有逐字稿，無法重新生成或修補；可於「✏️ 編輯與分析」手動修改。")
+
+        col_regen, col_repair = st.columns(2)
+        regen_btn = col_regen.button("🔁 重新生成此段", use_container_width=True, disabled=not has_transcript)
+        repair_btn = col_repair.button("🩹 修補未通過項目", use_container_width=True,
+                                       disabled=not (failed and has_transcript))
+
+        if regen_btn or repair_btn:
+            edit_placeholder = st.empty()
+            edit_placeholder.info("🤖 AI 正在修訂段落，請稍候...")
             try:
-                docx_data = build_docx_from_markdown(article)
-                st.download_button(
-                    "📥 下載 Word (.docx)",
-                    data=docx_data,
-                    file_name=f"{filename_base}.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    use_container_width=True
-                )
+                if regen_btn:
+                    new_article, new_checks = regenerate_section(
+                        article, section_index, result["subject"], result["company"],
+                        result["participants"], result["transcript"], result["paragraphs"],
+                        api_key, model=result["model"], instruction=instruction
+                    )
+                else:
+                    new_article, new_checks, repair_log = repair_article(
+                        article, result["subject"], result["company"], result["participants"],
+                        result["transcript"], result["paragraphs"], api_key, model=result["model"]
+                    )
+                    new_checks["自動修補"] = checks.get("自動修補", []) + repair_log
+                edit_placeholder.empty()
             except Exception as e:
-                st.error(f"Word 檔案生成失敗：{e}")
-            
-            st.divider()
-            
-            # ✅ 純文字下載
-            st.subheader("📝 純文字檔")
-            # 移除 Markdown 標記
-            plain_text = article.replace("# ", "").replace("## ", "").replace("**", "")
-            st.download_button(
-                "📥 下載純文字 (.txt)",
-                data=plain_text,
-                file_name=f"{filename_base}.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
+                edit_placeholder.empty()
+                st.error(f"❌ 段落修訂失敗：{e}")
+            else:
+                result["article"] = new_article
+                result["checks"] = {**checks, **new_checks}
+                st.rerun()
 
-    except Exception as e:
-        status_placeholder.empty()  # ✅ 清除狀態訊息
-        error_msg = str(e)
-        if "模板載入失敗" in error_msg:
-            st.error("❌ 模板載入失敗，請確認 engine/templates/article_template.txt 是否存在且可讀取。")
-        elif "max_completion_tokens" in error_msg or "max_tokens" in error_msg:
-            st.error("⚠️ 參數錯誤：請更新 OpenAI 套件版本或確認模型支援。")
-        else:
-            st.error(f"❌ 生成失敗：{error_msg}")
\ No newline at end of file
+    with tab6:
+        stats = analyzer.analyze(blocks)
+        lexicon_hits = sum(sum(stats["lexicon"].get(c, {}).values()) for c in (CATEGORY_BANNED, CATEGORY_FILLER))
+        col_words, col_paras, col_quotes, col_heads, col_terms = st.columns(5)
+        col_words.metric("字數", stats["word_count"],
+                         help=f"建議 {stats['word_range'][0]}–{stats['word_range'][1]} 字")
+        col_paras.metric("段落", stats["paragraphs"])
+        col_quotes.metric("引言", stats["quotes"])
+        col_heads.metric("小標題", len(stats["headings"]["h2"]))
+        col_terms.metric("用語提示", lexicon_hits)
+        st.caption(f"共 {stats['blocks']} 個區塊，本次重新分析 {stats['reanalyzed']} 個"
+                   "（以空行分段；清空區塊即刪除，輸入空行即拆分）")
+
+        revision = result.get("revision", 0)
+        edited = []
+        for idx, block in enumerate(blocks):
+            is_heading = block.startswith("#") and "\n" not in block.strip()
+            edited.append(st.text_area(
+                f"區塊 {idx + 1}", block, key=f"edit_block_{revision}_{idx}",
+                height=68 if is_heading else 200, label_visibility="collapsed"
+            ))
+            block_stats = analyzer.block_stats(block)
+            notes = [f"區塊 {idx + 1}", f"{block_stats['words']} 字", f"{block_stats['quotes']} 則引言"]
+            st.caption("　".join(notes + analyzer.warnings(block)))
+
+        if edited != blocks:
+            result["article"] = join_blocks(block for block in edited if block.strip())
+            result["revision"] = revision + 1
+            st.rerun()
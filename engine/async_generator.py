@@ -0,0 +1,245 @@
+# ==========================================================
+#  async_generator.py（非同步版 - 以 AsyncOpenAI 呼叫）
+# ==========================================================
+# 與 generator.py 共用請求準備（模板、預算規劃、快取指紋）、提示詞與品質檢查，
+# 讓多篇生成可以在同一個 event loop 上並行，而不必各佔一條執行緒。
+
+import asyncio
+import io
+import time
+from typing import Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from engine.cache import ResponseCache
+from engine.ingest import TranscriptSource, iter_segments
+from engine.planner import MODE_SUMMARIZE
+from engine.postprocess import sanitize_markdown
+from engine.store import ArticleStore
+from engine.tokens import count_tokens
+from engine.generator import (
+    CASCADE_TIERS,
+    DEFAULT_CASCADE_CHECKS,
+    DEFAULT_MODEL,
+    MAX_API_ATTEMPTS,
+    MAX_SEGMENT_LENGTH,
+    SUMMARY_MODEL,
+    SYSTEM_PROMPT,
+    TEMPERATURE,
+    TEMPLATE_MODE_COMPACT,
+    TEMPLATE_MODE_VERBOSE,
+    TOP_P,
+    _build_user_prompt,
+    _cascade_failures,
+    _count_chars,
+    _prepare_request,
+    _prepare_transcript,
+    _save_article,
+    _save_to_cache,
+    _transcript_chars,
+    quality_check,
+)
+
+# === 常數定義 ===
+MAX_CONCURRENT_SUMMARIES = 4
+
+
+async def agenerate_article(
+    subject: str,
+    company: str,
+    participants: str,
+    transcript: TranscriptSource,
+    summary_points: str,
+    opening_style: str,
+    opening_context: str,
+    paragraphs: int,
+    api_key: str,
+    model: str = DEFAULT_MODEL,
+    max_tokens: Optional[int] = None,
+    cache: Optional[ResponseCache] = None,
+    bypass_cache: bool = False,
+    cascade: bool = False,
+    cascade_checks: Optional[List[str]] = None,
+    template_mode: str = TEMPLATE_MODE_VERBOSE,
+    dedupe: bool = False,
+    fix_terms: bool = False,
+    store: Optional[ArticleStore] = None
+) -> Tuple[str, Dict, int]:
+    """
+    generate_article 的非同步版本
+
+    - 參數與回傳值與 generate_article 相同（快取、分級模式、精簡模板、重複段落移除、用語替換、文章庫皆支援）
+    - 對沖請求與自動修補僅於同步版提供；相同輸入與同步版共用快取項目
+    """
+    request = _prepare_request(
+        subject, company, participants, transcript, summary_points,
+        opening_style, opening_context, paragraphs, model, max_tokens, cascade, cascade_checks,
+        template_mode, dedupe, fix_terms,
+    )
+    selected_model, cascade = request["selected_model"], request["cascade"]
+    participants_info, participants_desc = request["participants_info"], request["participants_desc"]
+    transcript, template_text, plan = request["transcript"], request["template_text"], request["plan"]
+    max_tokens, fingerprint = request["max_tokens"], request["fingerprint"]
+    dedup_report = request["dedup_report"]
+
+    # === 回應快取 ===
+    if cache is not None and not bypass_cache:
+        cached = cache.get(fingerprint)
+        if cached is not None:
+            print(f"⚡ 快取命中（{fingerprint[:12]}）")
+            return cached
+
+    # === 逐字稿處理模式（direct／extractive／summarize） ===
+    compressed_transcript = _prepare_transcript(plan, transcript, participants_info)
+    if plan["mode"] == MODE_SUMMARIZE:
+        print(f"⚠️ 啟用長逐字稿安全模式（約 {_transcript_chars(transcript)} 字）")
+        compressed_transcript = await asummarize_long_transcript(transcript, SUMMARY_MODEL, api_key)
+
+    user_prompt = _build_user_prompt(
+        subject, company, paragraphs, opening_style, opening_context,
+        participants_desc, compressed_transcript, summary_points, template_text,
+        compact=template_mode == TEMPLATE_MODE_COMPACT,
+    )
+    template_tokens = count_tokens(template_text)
+
+    # === 呼叫 Chat Completions API ===
+    client = AsyncOpenAI(api_key=api_key)
+    tiers = list(CASCADE_TIERS) if cascade else [selected_model]
+    tier_log = []
+
+    try:
+        for tier_idx, tier_model in enumerate(tiers):
+            is_last_tier = tier_idx == len(tiers) - 1
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            tier_start = time.perf_counter()
+
+            try:
+                article, attempt = await _acomplete_with_retries(
+                    client, tier_model, SYSTEM_PROMPT, user_prompt, max_tokens, usage
+                )
+            except Exception as e:
+                if is_last_tier:
+                    raise
+                print(f"⬆️ {tier_model} 呼叫失敗，升級至 {tiers[tier_idx + 1]}：{e}")
+                tier_log.append({"model": tier_model, "error": str(e)})
+                continue
+
+            if fix_terms:
+                article = sanitize_markdown(article, fix_terms=True)
+            checks = quality_check(article, paragraphs, participants_info)
+            checks["提示詞統計"] = {
+                "transcript_mode": plan["mode"],
+                "max_tokens": max_tokens,
+                "template_mode": template_mode,
+                "template_tokens": template_tokens,
+                "prompt_tokens": usage["prompt_tokens"],
+                "latency": round(time.perf_counter() - tier_start, 2),
+            }
+            if dedup_report is not None:
+                checks["重複段落"] = dedup_report
+
+            if cascade:
+                failed = _cascade_failures(article, checks, cascade_checks or DEFAULT_CASCADE_CHECKS)
+                tier_log.append({
+                    "model": tier_model,
+                    "latency": round(time.perf_counter() - tier_start, 2),
+                    **usage,
+                    "failed_checks": failed,
+                })
+                if failed and not is_last_tier:
+                    print(f"⬆️ {tier_model} 未通過 {failed}，升級至 {tiers[tier_idx + 1]}")
+                    continue
+                checks["服務層級"] = tier_model
+                checks["分級紀錄"] = tier_log
+
+            print(f"✅ 文章生成成功（字數：{_count_chars(article)}）")
+            if store is not None:
+                await asyncio.to_thread(
+                    _save_article, store, article, checks, attempt, subject, company, participants,
+                    participants_info, paragraphs, tier_model, fingerprint,
+                )
+            if cache is not None:
+                _save_to_cache(cache, fingerprint, article, checks, attempt)
+            return article, checks, attempt
+    finally:
+        await client.close()
+
+    raise Exception("未預期錯誤：生成失敗")
+
+
+async def _acomplete_with_retries(
+    client: AsyncOpenAI,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    usage: Dict
+) -> Tuple[str, int]:
+    """非同步呼叫 API 取得文章（失敗時重試），回傳（文章, 重試次數）"""
+    for attempt in range(MAX_API_ATTEMPTS):
+        try:
+            print(f"🔄 嘗試生成文章（{model}，第 {attempt + 1}/{MAX_API_ATTEMPTS} 次）")
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=TEMPERATURE,
+                top_p=TOP_P,
+                max_tokens=min(max_tokens, 16000),
+            )
+            if response.usage is not None:
+                usage["prompt_tokens"] += response.usage.prompt_tokens
+                usage["completion_tokens"] += response.usage.completion_tokens
+            return response.choices[0].message.content.strip(), attempt
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"⚠️ API 呼叫失敗（第 {attempt + 1} 次）：{error_msg}")
+
+            if attempt == MAX_API_ATTEMPTS - 1:
+                raise Exception(f"API 呼叫失敗（已重試 {MAX_API_ATTEMPTS} 次）：{error_msg}")
+
+    raise Exception("未預期錯誤：生成失敗")
+
+
+async def asummarize_long_transcript(
+    transcript: TranscriptSource,
+    model: str,
+    api_key: str,
+    max_concurrency: int = MAX_CONCURRENT_SUMMARIES
+) -> str:
+    """長逐字稿摘要模式（非同步版，各段並行摘要，結果依原順序組合）"""
+    client = AsyncOpenAI(api_key=api_key)
+    lines = io.StringIO(transcript) if isinstance(transcript, str) else transcript
+    segments = list(iter_segments(lines, MAX_SEGMENT_LENGTH))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def summarize(idx: int, seg: str) -> str:
+        async with semaphore:
+            print(f"🧩 正在摘要第 {idx} 段 / 共 {len(segments)} 段")
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": "你是一位摘要專家，請保留人物觀點、數據、事件邏輯。"},
+                        {"role": "user", "content": f"請摘要以下逐字稿內容，限 300–400 字：\n{seg}"},
+                    ],
+                    temperature=0.5,
+                    max_tokens=800,
+                )
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                print(f"⚠️ 第 {idx} 段摘要失敗：{e}")
+                return f"[摘要失敗：{seg[:200]}...]"
+
+    try:
+        summaries = await asyncio.gather(
+            *(summarize(idx, seg) for idx, seg in enumerate(segments, 1))
+        )
+    finally:
+        await client.close()
+
+    print("✅ 摘要完成，組合為壓縮版逐字稿")
+    return "\n\n".join(summaries)
@@ -0,0 +1,194 @@
+"""
+多篇文章批次匯出（ZIP）
+
+每篇文章輸出 .md／.txt／.docx／meta.json，於行程池平行轉換，
+完成一篇即寫入 ZIP 並釋放，不需把所有檔案同時留在記憶體。
+
+命令列（從文章庫匯出一週的文章）：
+    python -m engine.bundle --since 2025-10-13 --until 2025-10-19 -o week.zip
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypedDict
+
+from engine.postprocess import analyze_article, build_docx_from_markdown, build_meta_json, build_plain_text
+
+# === 常數定義 ===
+EXPORT_FORMATS = ("md", "txt", "docx", "json")
+MIN_ITEMS_PER_WORKER = 4        # 篇數太少時直接在本行程轉換，省去啟動行程池的成本
+MAX_IN_FLIGHT_PER_WORKER = 2    # 每個工作行程最多排隊的篇數，限制記憶體用量
+MAX_BUNDLE_ARTICLES = 5000
+MAX_UI_BUNDLE_ARTICLES = 200    # 介面下載時 Streamlit 會在記憶體保留一份完整 ZIP，大量匯出請用命令列
+
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\s]+')
+
+BundleFile = Tuple[str, bytes, int]     # （ZIP 內路徑, 內容, 壓縮方式）
+
+
+class BundleItem(TypedDict, total=False):
+    id: int
+    company: str
+    subject: str
+    article: str
+    meta: Dict
+    created_at: str
+
+
+class BundleReport(TypedDict):
+    articles: int
+    files: int
+    bytes: int
+    workers: int
+    seconds: float
+
+
+def export_bundle(
+    items: Sequence[BundleItem],
+    dest: BinaryIO | Path | str,
+    formats: Iterable[str] = EXPORT_FORMATS,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> BundleReport:
+    """
+    將多篇文章匯出成一個 ZIP
+
+    - 每篇放在「企業_主題_編號/」資料夾內，依 formats 輸出 md／txt／docx／json（meta.json）
+    - DOCX 轉換在行程池平行執行（spawn，可安全地從 Streamlit 的執行緒呼叫）；
+      同時排隊的篇數有上限，完成一篇即寫入 ZIP
+    - dest 可為檔案路徑或可寫入的二進位串流（不需可 seek）
+    - progress(已完成篇數, 總篇數) 於每篇寫入後呼叫
+
+    Args:
+        workers: 工作行程數（預設依 CPU 數與篇數決定；1 表示不使用行程池）
+    """
+    formats = tuple(f for f in EXPORT_FORMATS if f in set(formats))
+    if not formats:
+        raise ValueError(f"至少需指定一種格式（{', '.join(EXPORT_FORMATS)}）")
+    if len(items) > MAX_BUNDLE_ARTICLES:
+        raise ValueError(f"一次最多匯出 {MAX_BUNDLE_ARTICLES} 篇（目前 {len(items)} 篇）")
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, max(1, len(items) // MIN_ITEMS_PER_WORKER))
+    start = time.perf_counter()
+    report: BundleReport = {"articles": 0, "files": 0, "bytes": 0, "workers": workers, "seconds": 0.0}
+
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        def write(files: List[BundleFile]) -> None:
+            for arcname, data, compress_type in files:
+                bundle.writestr(arcname, data, compress_type=compress_type)
+                report["files"] += 1
+                report["bytes"] += len(data)
+            report["articles"] += 1
+            if progress is not None:
+                progress(report["articles"], len(items))
+
+        jobs = [(item, _folder_name(item, idx), formats) for idx, item in enumerate(items, 1)]
+        if workers <= 1:
+            for job in jobs:
+                write(render_item(*job))
+        else:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                pending: set[Future] = set()
+                queue = iter(jobs)
+                for job in queue:
+                    pending.add(pool.submit(render_item, *job))
+                    if len(pending) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            write(future.result())
+                for future in wait(pending).done:
+                    write(future.result())
+
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    return report
+
+
+def render_item(item: BundleItem, folder: str, formats: Tuple[str, ...]) -> List[BundleFile]:
+    """轉換單篇文章的所有檔案（於工作行程執行）"""
+    article = item["article"]
+    files: List[BundleFile] = []
+    if "md" in formats:
+        files.append((f"{folder}/{folder}.md", article.encode("utf-8"), zipfile.ZIP_DEFLATED))
+    if "txt" in formats:
+        files.append((f"{folder}/{folder}.txt", build_plain_text(article).encode("utf-8"), zipfile.ZIP_DEFLATED))
+    if "docx" in formats:
+        # DOCX 本身已是壓縮檔，不再重複壓縮
+        files.append((f"{folder}/{folder}.docx", build_docx_from_markdown(article), zipfile.ZIP_STORED))
+    if "json" in formats:
+        files.append((f"{folder}/meta.json", _meta_bytes(item), zipfile.ZIP_DEFLATED))
+    return files
+
+
+def _meta_bytes(item: BundleItem) -> bytes:
+    """使用文章庫保存的 meta；沒有時以 analyze_article 重新產生"""
+    if item.get("meta"):
+        return json.dumps(item["meta"], ensure_ascii=False, indent=2).encode("utf-8")
+    return build_meta_json(
+        item.get("subject", ""), item.get("company", ""), "", "", item["article"],
+        analyze_article(item["article"], word_range=(1500, 2500)), 0,
+    )
+
+
+def _folder_name(item: BundleItem, index: int) -> str:
+    parts = [item.get("company", ""), item.get("subject", ""), str(item.get("id", index))]
+    return "_".join(_UNSAFE_FILENAME.sub("-", p).strip("-") for p in parts if p) or f"article_{index}"
+
+
+def items_from_store(store, hits: Iterable[Dict]) -> List[BundleItem]:
+    """將文章庫的搜尋結果轉為匯出項目"""
+    items: List[BundleItem] = []
+    for hit in hits:
+        stored = store.get(hit["id"])
+        if stored is not None:
+            items.append({key: stored[key] for key in ("id", "company", "subject", "article", "meta", "created_at")})
+    return items
+
+
+# === 命令列 ===
+def main(argv: Optional[List[str]] = None) -> None:
+    from engine.store import DEFAULT_DB_PATH, ArticleStore
+
+    parser = argparse.ArgumentParser(description="從文章庫批次匯出 ZIP")
+    parser.add_argument("query", nargs="*", help="關鍵字（以空白分隔）")
+    parser.add_argument("-o", "--output", required=True, help="輸出的 ZIP 路徑")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="資料庫路徑")
+    parser.add_argument("--company")
+    parser.add_argument("--subject")
+    parser.add_argument("--since", help="起始日期（YYYY-MM-DD）")
+    parser.add_argument("--until", help="結束日期（YYYY-MM-DD）")
+    parser.add_argument("--limit", type=int, default=MAX_BUNDLE_ARTICLES)
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS), help="輸出格式，以逗號分隔")
+    parser.add_argument("--workers", type=int, help="工作行程數")
+    args = parser.parse_args(argv)
+
+    store = ArticleStore(args.db)
+    hits = store.search(
+        " ".join(args.query), company=args.company, subject=args.subject,
+        since=args.since, until=args.until, limit=args.limit,
+    )
+    if not hits:
+        sys.exit("❌ 沒有符合條件的文章")
+
+    items = items_from_store(store, hits)
+    print(f"📦 匯出 {len(items)} 篇文章 → {args.output}", file=sys.stderr)
+
+    def show_progress(done: int, total: int) -> None:
+        print(f"\r  {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    report = export_bundle(items, args.output, args.formats.split(","), args.workers, show_progress)
+    print(f"\n✅ 完成：{report['files']} 個檔案，{report['bytes'] / 1e6:.1f} MB，"
+          f"{report['workers']} 個工作行程，{report['seconds']} 秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
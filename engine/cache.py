@@ -0,0 +1,119 @@
+import json
+import os
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# === 常數定義 ===
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "responses"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500
+CACHE_FORMAT_VERSION = 1
+
+
+def request_fingerprint(**inputs) -> str:
+    """
+    將所有生成參數轉為穩定的指紋（SHA-256）
+
+    - 以排序後的 JSON 序列化，確保參數順序不影響結果
+    - 呼叫端應傳入：文章輸入、模板雜湊、實際模型與取樣參數
+    - 請勿傳入 API Key
+    """
+    canonical = json.dumps(
+        {"v": CACHE_FORMAT_VERSION, **inputs},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """計算文字內容的雜湊（用於模板版本辨識）"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    完整回應快取（磁碟儲存）
+
+    - 每筆快取為一個 JSON 檔，檔名即為指紋
+    - TTL：超過存活時間的項目視為失效並刪除
+    - LRU：命中時更新檔案修改時間，超過上限時淘汰最久未使用者
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | str = DEFAULT_CACHE_DIR,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.json"
+
+    def get(self, fingerprint: str) -> Optional[Tuple[str, Dict, int]]:
+        """讀取快取；未命中或已過期時回傳 None"""
+        path = self._path(fingerprint)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+
+        # 更新存取時間（LRU 依據）
+        os.utime(path, None)
+        return entry["article"], entry["checks"], entry["attempt"]
+
+    def set(self, fingerprint: str, article: str, checks: Dict, attempt: int) -> None:
+        """寫入快取（先寫入唯一的暫存檔再替換，避免讀到半份檔案；同時寫入同一指紋也不會互相干擾）"""
+        entry = {
+            "created_at": time.time(),
+            "article": article,
+            "checks": checks,
+            "attempt": attempt,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{fingerprint[:12]}.", suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(fingerprint))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        """刪除過期項目，並依 LRU 淘汰超過上限的項目"""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((mtime, path))
+
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            entries.sort()
+            for _, path in entries[:overflow]:
+                path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """清空所有快取"""
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,158 @@
+import re
+from typing import Dict, List, TypedDict
+
+import numpy as np
+
+from engine.ingest import _split_long_line, iter_segments
+
+# === 常數定義 ===
+SHINGLE_SIZE = 3                # 字元 k-gram 長度
+NUM_PERMUTATIONS = 64           # MinHash 簽章長度
+LSH_BANDS = 16                  # 16 組 × 4 列，候選門檻約 0.5
+SIMILARITY_THRESHOLD = 0.7      # 估計 Jaccard 相似度達此值視為重複
+MIN_PASSAGE_CHARS = 20          # 過短的句子（例如「對。」）不列入比對
+MAX_PASSAGE_CHARS = 300         # 過長的行先依句尾標點切開再比對
+CHUNK_SHINGLES = 1 << 16        # 每批計算的 k-gram 數，限制記憶體用量
+RANDOM_SEED = 20240601
+
+_NON_CONTENT = re.compile(r"[\W_]+")
+_HASH_BASE = np.uint64(1_000_003)
+_SHIFT = np.uint64(32)
+
+
+class DedupResult(TypedDict):
+    text: str
+    passages: int
+    removed_passages: int
+    original_chars: int
+    saved_chars: int
+    original_segments: int
+    saved_segments: int
+
+
+def dedupe_transcript(
+    transcript: str,
+    threshold: float = SIMILARITY_THRESHOLD,
+    segment_length: int = 0
+) -> DedupResult:
+    """
+    移除逐字稿中近似重複的段落（同一件事講兩次、訪問者複述、語音辨識重複輸出）
+
+    - 以行為段落（過長的行依句尾標點切開），去除空白與標點後取字元 k-gram
+    - MinHash 簽章以 NumPy 向量化計算，LSH 分組找出候選，再以簽章估計相似度確認
+    - 保留第一次出現的原文，後續重複的段落刪除；其餘內容、空行、縮排與行序不變
+
+    Args:
+        threshold: 估計 Jaccard 相似度門檻
+        segment_length: 大於 0 時，一併計算摘要模式可省下的分段數
+    """
+    lines = transcript.splitlines(keepends=True)
+    pieces = []   # (行號, 原文)
+    for line_no, line in enumerate(lines):
+        for piece in _split_long_line(line.strip(), MAX_PASSAGE_CHARS):
+            if piece:
+                pieces.append((line_no, piece))
+
+    normalized = [_NON_CONTENT.sub("", piece) for _, piece in pieces]
+    candidates = [i for i, text in enumerate(normalized) if len(text) >= MIN_PASSAGE_CHARS]
+    duplicates = _find_duplicates([normalized[i] for i in candidates], threshold)
+    removed = {candidates[i] for i in duplicates}
+
+    kept: Dict[int, List[str]] = {}
+    touched = set()
+    for idx, (line_no, piece) in enumerate(pieces):
+        if idx in removed:
+            touched.add(line_no)
+        else:
+            kept.setdefault(line_no, []).append(piece)
+
+    # 未受影響的行（含空行、縮排與換行符號）原樣保留；整行重複者刪除
+    out = []
+    for line_no, line in enumerate(lines):
+        if line_no not in touched:
+            out.append(line)
+        elif line_no in kept:
+            body = line.rstrip("\r\n")
+            indent = body[:len(body) - len(body.lstrip())]
+            out.append(indent + "".join(kept[line_no]) + line[len(body):])
+    text = "".join(out)
+
+    original_segments = saved_segments = 0
+    if segment_length > 0:
+        original_segments = sum(1 for _ in iter_segments(transcript.splitlines(), segment_length))
+        saved_segments = original_segments - sum(1 for _ in iter_segments(text.splitlines(), segment_length))
+
+    return {
+        "text": text,
+        "passages": len(pieces),
+        "removed_passages": len(removed),
+        "original_chars": len(transcript),
+        "saved_chars": sum(len(pieces[i][1]) for i in removed),
+        "original_segments": original_segments,
+        "saved_segments": saved_segments,
+    }
+
+
+def _find_duplicates(texts: List[str], threshold: float) -> List[int]:
+    """依序比對，回傳與先前保留段落近似重複者的索引（每段文字至少 SHINGLE_SIZE 字）"""
+    if len(texts) < 2:
+        return []
+
+    signatures = _minhash_signatures(texts)
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(LSH_BANDS)]
+    duplicates = []
+
+    for idx, signature in enumerate(signatures):
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(LSH_BANDS)]
+        candidates = set()
+        for bucket, key in zip(buckets, keys):
+            candidates.update(bucket.get(key, ()))
+
+        if candidates:
+            matches = np.count_nonzero(signatures[list(candidates)] == signature, axis=1)
+            if matches.max() >= threshold * NUM_PERMUTATIONS:
+                duplicates.append(idx)
+                continue
+        for bucket, key in zip(buckets, keys):
+            bucket.setdefault(key, []).append(idx)
+
+    return duplicates
+
+
+def _minhash_signatures(texts: List[str]) -> np.ndarray:
+    """
+    計算每段文字的 MinHash 簽章，形狀為 (段落數, NUM_PERMUTATIONS)
+
+    - 所有段落串接後一次算出滾動 k-gram 雜湊，再排除跨段落的 k-gram
+    - 以 multiply-shift 雜湊模擬排列，依段落分批取最小值（np.minimum.reduceat）
+    """
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    gram_count = len(codes) - SHINGLE_SIZE + 1
+    hashes = np.zeros(gram_count, dtype=np.uint64)
+    for j in range(SHINGLE_SIZE):
+        hashes = hashes * _HASH_BASE + codes[j:j + gram_count]
+
+    counts = lengths - SHINGLE_SIZE + 1
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    positions = np.arange(bounds[-1]) + np.repeat(offsets - bounds[:-1], counts)
+    shingles = hashes[positions]
+
+    rng = np.random.default_rng(RANDOM_SEED)
+    a = rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint64)
+    first = 0
+    while first < len(texts):
+        last = int(np.searchsorted(bounds, bounds[first] + CHUNK_SHINGLES, side="right")) - 1
+        last = min(max(last, first + 1), len(texts))
+        block = shingles[bounds[first]:bounds[last]]
+        permuted = (a[:, None] * block[None, :] + b[:, None]) >> _SHIFT
+        signatures[first:last] = np.minimum.reduceat(permuted, bounds[first:last] - bounds[first], axis=1).T
+        first = last
+
+    return signatures
@@ -0,0 +1,220 @@
+import re
+import threading
+from io import BytesIO
+from typing import Dict, Iterable, List, Tuple, TypedDict
+
+from docx import Document
+from docx.oxml import parse_xml
+from lxml import etree
+
+from engine.lexicon import CATEGORY_BANNED, CATEGORY_FILLER, build_lexicon
+from engine.postprocess import build_plain_text, count_quotes, count_words, extract_all_headings
+
+# === 常數定義 ===
+BLOCK_SEPARATOR = "\n\n"
+_HEADING_PATTERN = re.compile(r"^#{1,6}\s+")
+_BARE_HEADING_PATTERN = re.compile(r"^#{1,6}\s*$", re.MULTILINE)
+DEFAULT_WORD_RANGE = (1500, 2500)
+DEFAULT_MIN_QUOTES = 4
+
+
+class BlockStats(TypedDict):
+    words: int
+    quotes: int
+    is_paragraph: bool              # 非純標題的區塊才計入段落數
+    headings: Dict[str, List[str]]
+    lexicon: Dict[str, List[str]]   # 分類 → 命中詞彙（依出現順序）
+    suggestions: List[str]          # 大陸用語的建議替換，例如「落地→實際導入」
+
+
+class ArticleStats(TypedDict):
+    word_count: int
+    within_range: bool
+    word_range: Tuple[int, int]
+    paragraphs: int
+    quotes: int
+    has_enough_quotes: bool
+    min_quotes: int
+    headings: Dict[str, List[str]]
+    h3_count: int
+    total_heading_count: int
+    lexicon: Dict[str, Dict[str, int]]
+    blocks: int
+    reanalyzed: int
+
+
+def split_blocks(md: str) -> List[str]:
+    """以空行切分為區塊（與 count_paragraphs 相同的切分方式），join_blocks 可還原原文"""
+    return md.replace("\r\n", "\n").split(BLOCK_SEPARATOR)
+
+
+def join_blocks(blocks: Iterable[str]) -> str:
+    return BLOCK_SEPARATOR.join(blocks)
+
+
+class BlockAnalyzer:
+    """
+    逐區塊的增量分析與匯出快取（每篇文章一個實例）
+
+    - 以區塊原文為鍵快取字數、引言、標題與詞庫命中；編輯後只有內容改變的區塊重新分析
+    - 總計由各區塊加總，與 analyze_article 的欄位相同，並多出詞庫命中統計
+    - DOCX／TXT 匯出同樣逐區塊快取，重建時只轉換改變的區塊，再組合成完整檔案
+    - 只保留目前文章中存在的區塊，快取大小不會隨編輯次數成長
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        word_range: Tuple[int, int] = DEFAULT_WORD_RANGE,
+        min_quotes: int = DEFAULT_MIN_QUOTES
+    ):
+        self.lexicon = build_lexicon(tuple(names))
+        self.word_range = word_range
+        self.min_quotes = min_quotes
+        self._stats: Dict[str, BlockStats] = {}
+        self._docx: Dict[str, Tuple[bytes, ...]] = {}
+        self._text: Dict[str, str] = {}
+        self._scratch = Document()
+        self._lock = threading.Lock()
+        self._separator = self._lines_xml([""])   # 區塊之間的空行
+
+    # === 分析 ===
+    def block_stats(self, block: str) -> BlockStats:
+        stats = self._stats.get(block)
+        if stats is None:
+            stats = self._stats[block] = self._analyze_block(block)
+        return stats
+
+    def _analyze_block(self, block: str) -> BlockStats:
+        lexicon: Dict[str, List[str]] = {}
+        suggestions = []
+        for hit in self.lexicon.scan(block):
+            lexicon.setdefault(hit["category"], []).append(hit["term"])
+            if hit["category"] == CATEGORY_BANNED:
+                suggestions.append(f"{hit['term']}→{hit['replacement']}")
+        stripped = block.strip()
+        return {
+            "words": count_words(block),
+            "quotes": count_quotes(block),
+            "is_paragraph": bool(stripped) and not _HEADING_PATTERN.match(stripped),
+            "headings": extract_all_headings(block),
+            "lexicon": lexicon,
+            "suggestions": list(dict.fromkeys(suggestions)),
+        }
+
+    def analyze(self, blocks: List[str]) -> ArticleStats:
+        """分析整篇文章（只有新出現的區塊會實際計算）"""
+        reanalyzed = sum(1 for block in set(blocks) if block not in self._stats)
+        word_count = quotes = paragraphs = 0
+        headings: Dict[str, List[str]] = {"h1": [], "h2": [], "h3": []}
+        lexicon: Dict[str, Dict[str, int]] = {}
+
+        for block in blocks:
+            stats = self.block_stats(block)
+            word_count += stats["words"]
+            quotes += stats["quotes"]
+            paragraphs += stats["is_paragraph"]
+            for level, titles in stats["headings"].items():
+                headings[level].extend(titles)
+            for category, terms in stats["lexicon"].items():
+                counts = lexicon.setdefault(category, {})
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+
+        self._prune(blocks)
+        return {
+            "word_count": word_count,
+            "within_range": self.word_range[0] <= word_count <= self.word_range[1],
+            "word_range": self.word_range,
+            "paragraphs": paragraphs,
+            "quotes": quotes,
+            "has_enough_quotes": quotes >= self.min_quotes,
+            "min_quotes": self.min_quotes,
+            "headings": headings,
+            "h3_count": len(headings["h3"]),
+            "total_heading_count": sum(len(v) for v in headings.values()),
+            "lexicon": lexicon,
+            "blocks": len(blocks),
+            "reanalyzed": reanalyzed,
+        }
+
+    def warnings(self, block: str) -> List[str]:
+        """區塊的詞庫提示（大陸用語與空泛詞彙）"""
+        stats = self.block_stats(block)
+        notes = []
+        if stats["suggestions"]:
+            notes.append(f"🚫 大陸用語：{'、'.join(stats['suggestions'])}")
+        if stats["lexicon"].get(CATEGORY_FILLER):
+            notes.append(f"⚠️ 空泛詞彙：{'、'.join(dict.fromkeys(stats['lexicon'][CATEGORY_FILLER]))}")
+        return notes
+
+    # === 匯出 ===
+    def export_plain_text(self, blocks: List[str]) -> str:
+        """與 build_plain_text(join_blocks(blocks)) 相同，但只轉換改變的區塊"""
+        if any(_BARE_HEADING_PATTERN.search(block) for block in blocks):
+            # 只有 # 的行會連同後面的空行一起移除（跨越區塊），此時改為整篇轉換
+            return build_plain_text(join_blocks(blocks))
+        parts = []
+        for block in blocks:
+            text = self._text.get(block)
+            if text is None:
+                text = self._text[block] = build_plain_text(block)
+            parts.append(text)
+        return BLOCK_SEPARATOR.join(parts)
+
+    def export_docx(self, blocks: List[str]) -> bytes:
+        """與 build_docx_from_markdown(join_blocks(blocks)) 相同，但只轉換改變的區塊"""
+        doc = Document()
+        body = doc.element.body
+        anchor = body[-1]     # w:sectPr（版面設定）必須維持在最後
+
+        for idx, block in enumerate(blocks):
+            source = _docx_source(block, idx == len(blocks) - 1)
+            xml_parts = self._docx.get(source)
+            if xml_parts is None:
+                xml_parts = self._docx[source] = self._lines_xml(source.splitlines())
+            if idx:
+                xml_parts = self._separator + xml_parts
+            for xml in xml_parts:
+                anchor.addprevious(parse_xml(xml))
+
+        buf = BytesIO()
+        doc.save(buf)
+        return buf.getvalue()
+
+    def _lines_xml(self, lines: List[str]) -> Tuple[bytes, ...]:
+        """將 Markdown 行轉為 DOCX 段落的 XML（規則與 build_docx_from_markdown 相同）"""
+        with self._lock:
+            elements = []
+            for raw in lines:
+                line = raw.rstrip()
+                if not line:
+                    paragraph = self._scratch.add_paragraph("")
+                elif line.startswith("### "):
+                    paragraph = self._scratch.add_heading(line[4:].strip(), level=3)
+                elif line.startswith("## "):
+                    paragraph = self._scratch.add_heading(line[3:].strip(), level=2)
+                elif line.startswith("# "):
+                    paragraph = self._scratch.add_heading(line[2:].strip(), level=1)
+                else:
+                    paragraph = self._scratch.add_paragraph(line)
+                elements.append(etree.tostring(paragraph._p))
+                paragraph._p.getparent().remove(paragraph._p)
+        return tuple(elements)
+
+    def _prune(self, blocks: List[str]) -> None:
+        live = set(blocks)
+        live_docx = {_docx_source(block, idx == len(blocks) - 1) for idx, block in enumerate(blocks)}
+        for cache, keys in ((self._stats, live), (self._text, live), (self._docx, live_docx)):
+            for key in [k for k in cache if k not in keys]:
+                del cache[key]
+
+
+def _docx_source(block: str, is_last: bool) -> str:
+    """
+    區塊在全文中對應的行（與 md.splitlines() 一致）
+
+    後面還有區塊時，區塊結尾緊接著換行：空區塊是一個空行，以換行結尾的區塊多一個空行；
+    最後一個區塊則與 splitlines() 相同，結尾的換行不產生空行。
+    """
+    return block if is_last else block + "\n"
@@ -2,7 +2,10 @@
 #  generator.py（穩定版 - 僅使用 gpt-4o-mini 和 gpt-4o）
 # ==========================================================
 
+import io
 import os
+import threading
+import time
 
 # 清除可能的代理環境變數
 for _k in [
@@ -21,19 +24,81 @@ print("✅ 環境變數清理完成")
 # 主要生成邏輯
 # ==========================================================
 from openai import OpenAI
-from typing import Dict, Tuple, List, TypedDict
-from engine.template_loader import load_template
+from typing import Dict, Iterable, Tuple, List, Optional, TypedDict, Union
+from engine.template_loader import load_template, compile_template
+from engine.tokens import count_tokens
+from engine.ingest import TranscriptFile, TranscriptSource, iter_segments
+from engine.dedup import dedupe_transcript
+from engine.lexicon import CATEGORY_BANNED, CATEGORY_FILLER, CATEGORY_NAME, FILLER_WORDS, build_lexicon
+from engine.sections import (
+    Section, format_outline, join_sections, merge_tasks, plan_repairs, split_sections,
+)
+from engine.planner import (
+    EXTRACTIVE_RATIO, GenerationPlan, MODE_EXTRACTIVE, MODE_SUMMARIZE, extract_key_passages, plan_generation,
+)
+from engine.cache import ResponseCache, request_fingerprint, text_hash
+from engine.hedging import HedgePolicy, run_hedged
+from engine.postprocess import analyze_article, build_meta_json, sanitize_markdown
+from engine.store import ArticleStore
 
 # === 常數定義 ===
 TRANSCRIPT_LENGTH_THRESHOLD = 8000
 MAX_SEGMENT_LENGTH = 5000
 DEFAULT_MODEL = "gpt-4o-mini"
 SUMMARY_MODEL = "gpt-4o"
-MAX_TOKENS_NORMAL = 4000
-MAX_TOKENS_SAFE_MODE = 8000
+MAX_TOKENS_SAFE_MODE = 8000   # 規劃出的 max_tokens 上限
 TEMPERATURE = 0.7
 TOP_P = 0.9
 MAX_API_ATTEMPTS = 2
+TEMPLATE_MODE_VERBOSE = "verbose"
+TEMPLATE_MODE_COMPACT = "compact"
+# === 小節修補 ===
+SECTION_MAX_TOKENS = 1500
+MAX_REPAIR_ROUNDS = 2
+
+# === 分級模式（先快後強） ===
+CASCADE_ALIAS = "自動分級"
+CASCADE_TIERS = ("gpt-4o-mini", "gpt-4o")
+DEFAULT_CASCADE_CHECKS = [
+    "包含主標題", "段落數符合", "字數充足", "提及主軸人物", "has_enough_quotes",
+]
+
+# === 模型別名映射 ===
+MODEL_ALIAS = {
+    "gpt-5-mini": "gpt-4o-mini",
+    "gpt-4-turbo": "gpt-4o",
+    "gpt-5": "gpt-4o",
+    "快速測試": "gpt-4o-mini",
+    "正式生成": "gpt-4o",
+    "gpt-4o-mini": "gpt-4o-mini",
+    "gpt-4o": "gpt-4o",
+}
+
+# === 強化的 System Prompt ===
+SYSTEM_PROMPT = """你是一位資深專訪作者，熟悉商業、教育、與公共議題報導。
+
+【核心要求】
+1. 必須嚴格遵循「文章模板」的所有指示與結構規範
+2. 全文字數控制在 1500–2000 字
+3. 文章結構：開場 → 主體段落 → 結語
+4. 每段至少包含一則直接引言，使用全形引號「」
+5. 所有引言與資訊均須來自逐字稿，不得捏造
+6. 語氣專業、自然、具溫度與觀察性
+7. 每個段落需要加上簡潔精煉的小標題（## 格式）
+8. 段落節奏需保持輕重有致，避免平鋪直敘
+
+【語言要求】
+- 使用台灣慣用語，避免中國大陸用語
+- 統一使用：公部門、使用者、網路、高品質、實際導入、整合、領域、管理、提升效率
+- 避免使用：互聯網、高質量、落地、打通、賽道、管控、提效、增量
+
+【寫作原則】
+- 以第三人稱旁白撰寫
+- 保持專業中性，不使用推銷語氣
+- 用具體細節取代抽象形容
+- 段落開頭具轉場語，避免連續以引言開頭
+
+請完全按照「文章模板」的詳細規範執行。"""
 
 
 class ParticipantInfo(TypedDict):
@@ -46,79 +111,435 @@ def generate_article(
     subject: str,
     company: str,
     participants: str,
-    transcript: str,
+    transcript: TranscriptSource,
     summary_points: str,
     opening_style: str,
     opening_context: str,
     paragraphs: int,
     api_key: str,
     model: str = DEFAULT_MODEL,
-    max_tokens: int = MAX_TOKENS_NORMAL
+    max_tokens: Optional[int] = None,
+    cache: Optional[ResponseCache] = None,
+    bypass_cache: bool = False,
+    hedge: bool = False,
+    hedge_model: Optional[str] = None,
+    hedge_policy: Optional[HedgePolicy] = None,
+    cascade: bool = False,
+    cascade_checks: Optional[List[str]] = None,
+    template_mode: str = TEMPLATE_MODE_VERBOSE,
+    auto_repair: bool = False,
+    max_repair_rounds: int = MAX_REPAIR_ROUNDS,
+    dedupe: bool = False,
+    fix_terms: bool = False,
+    store: Optional[ArticleStore] = None
 ) -> Tuple[str, Dict, int]:
-    """生成專訪文章（支援 gpt-4o-mini 和 gpt-4o）"""
-
-    # === 模型別名映射 ===
-    model_alias = {
-        "gpt-5-mini": "gpt-4o-mini",
-        "gpt-4-turbo": "gpt-4o",
-        "gpt-5": "gpt-4o",
-        "快速測試": "gpt-4o-mini",
-        "正式生成": "gpt-4o",
-        "gpt-4o-mini": "gpt-4o-mini",
-        "gpt-4o": "gpt-4o",
-    }
-    selected_model = model_alias.get(model, DEFAULT_MODEL)
-    print(f"🧠 模型選擇：{model} → {selected_model}")
+    """
+    生成專訪文章（支援 gpt-4o-mini 和 gpt-4o）
+
+    - max_tokens：未指定時由 token 預算規劃依段落數與模型 context 決定
+    - cache：傳入 ResponseCache 即啟用完整回應快取（預設不啟用）
+    - bypass_cache：略過快取讀取，強制重新取樣（結果仍會寫回快取）
+    - hedge：啟用對沖請求，主要請求逾時未回應時再發出一個請求，先合格者勝出
+    - hedge_model：對沖請求使用的模型（預設與主要請求相同）
+    - cascade：分級模式，先以 gpt-4o-mini 生成，未通過 cascade_checks 才升級至 gpt-4o
+      （選擇「自動分級」亦會啟用；回傳的 checks 會記錄服務層級與各層延遲、用量）
+    - template_mode：verbose（原始模板）或 compact（精簡模板），
+      checks["提示詞統計"] 會記錄模板 tokens、實際輸入 tokens 與延遲以便 A/B 比較
+    - auto_repair：品質檢查未通過時，只改寫有問題的 ## 小節（最多 max_repair_rounds 輪），
+      不重新生成整篇；修補紀錄存於 checks["自動修補"]
+    - dedupe：送出前移除逐字稿中近似重複的段落（保留第一次出現的原文），
+      省下的字數與摘要分段數存於 checks["重複段落"]
+    - fix_terms：生成後自動將大陸用語替換為台灣用語（互聯網→網路、落地→實際導入…）
+    - store：傳入 ArticleStore 即於生成後保存文章、meta 與執行紀錄，編號存於 checks["文章編號"]
+    - transcript 可為上傳的 TranscriptFile：超長時直接逐行串流分段摘要，不讀入全文
+    """
+
+    # === 模型、受訪者、逐字稿、模板、預算規劃與快取指紋 ===
+    request = _prepare_request(
+        subject, company, participants, transcript, summary_points,
+        opening_style, opening_context, paragraphs, model, max_tokens, cascade, cascade_checks,
+        template_mode, dedupe, fix_terms,
+        hedge_model=hedge_model if hedge else None,
+        max_repair_rounds=max_repair_rounds if auto_repair else 0,
+    )
+    selected_model, cascade = request["selected_model"], request["cascade"]
+    participants_info, participants_desc = request["participants_info"], request["participants_desc"]
+    transcript, template_text, plan = request["transcript"], request["template_text"], request["plan"]
+    max_tokens, fingerprint = request["max_tokens"], request["fingerprint"]
+    dedup_report = request["dedup_report"]
+
+    # === 回應快取 ===
+    if cache is not None and not bypass_cache:
+        cached = cache.get(fingerprint)
+        if cached is not None:
+            print(f"⚡ 快取命中（{fingerprint[:12]}）")
+            return cached
+
+    # === 逐字稿處理模式（direct／extractive／summarize） ===
+    compressed_transcript = _prepare_transcript(plan, transcript, participants_info)
+    if plan["mode"] == MODE_SUMMARIZE:
+        print(f"⚠️ 啟用長逐字稿安全模式（約 {_transcript_chars(transcript)} 字）")
+        compressed_transcript = summarize_long_transcript(transcript, SUMMARY_MODEL, api_key)
+
+    # === User Prompt ===
+    user_prompt = _build_user_prompt(
+        subject, company, paragraphs, opening_style, opening_context,
+        participants_desc, compressed_transcript, summary_points, template_text,
+        compact=template_mode == TEMPLATE_MODE_COMPACT,
+    )
+    system_prompt = SYSTEM_PROMPT
+    template_tokens = count_tokens(template_text)
+
+    # === 呼叫 Chat Completions API ===
+    client = OpenAI(api_key=api_key)
+    tiers = list(CASCADE_TIERS) if cascade else [selected_model]
+    tier_log = []
+
+    for tier_idx, tier_model in enumerate(tiers):
+        is_last_tier = tier_idx == len(tiers) - 1
+        tier_hedge_model = MODEL_ALIAS.get(hedge_model, tier_model)
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        tier_start = time.perf_counter()
+
+        try:
+            article, hedge_info, attempt = _complete_with_retries(
+                client, api_key, tier_model, tier_hedge_model,
+                system_prompt, user_prompt, max_tokens, usage,
+                hedge=hedge,
+                accept=lambda a: all(quality_check(a, paragraphs, participants_info).values()),
+                hedge_policy=hedge_policy,
+            )
+        except Exception as e:
+            if is_last_tier:
+                raise
+            print(f"⬆️ {tier_model} 呼叫失敗，升級至 {tiers[tier_idx + 1]}：{e}")
+            tier_log.append({"model": tier_model, "error": str(e)})
+            continue
+
+        if fix_terms:
+            article = sanitize_markdown(article, fix_terms=True)
+        checks = quality_check(article, paragraphs, participants_info)
+        checks["提示詞統計"] = {
+            "transcript_mode": plan["mode"],
+            "max_tokens": max_tokens,
+            "template_mode": template_mode,
+            "template_tokens": template_tokens,
+            "prompt_tokens": usage["prompt_tokens"],
+            "latency": round(time.perf_counter() - tier_start, 2),
+        }
+        if hedge:
+            checks["對沖請求"] = hedge_info
+        if dedup_report is not None:
+            checks["重複段落"] = dedup_report
+
+        if cascade:
+            failed = _cascade_failures(article, checks, cascade_checks or DEFAULT_CASCADE_CHECKS)
+            tier_log.append({
+                "model": tier_model,
+                "latency": round(time.perf_counter() - tier_start, 2),
+                **usage,
+                "failed_checks": failed,
+            })
+            if failed and not is_last_tier:
+                print(f"⬆️ {tier_model} 未通過 {failed}，升級至 {tiers[tier_idx + 1]}")
+                continue
+            checks["服務層級"] = tier_model
+            checks["分級紀錄"] = tier_log
+
+        if auto_repair and any(v is False for v in checks.values()):
+            article, repaired_checks, repair_log = _repair_loop(
+                client, tier_model, article, paragraphs, participants_info,
+                subject, company, participants_desc, compressed_transcript, max_repair_rounds,
+            )
+            checks.update(repaired_checks)
+            checks["自動修補"] = repair_log
+
+        print(f"✅ 文章生成成功（字數：{_count_chars(article)}）")
+        if store is not None:
+            _save_article(
+                store, article, checks, attempt, subject, company, participants,
+                participants_info, paragraphs, tier_model, fingerprint,
+            )
+        if cache is not None:
+            _save_to_cache(cache, fingerprint, article, checks, attempt)
+        return article, checks, attempt
+
+    raise Exception("未預期錯誤：生成失敗")
+
+
+class PreparedRequest(TypedDict):
+    selected_model: str
+    cascade: bool
+    participants_info: List[ParticipantInfo]
+    participants_desc: str
+    transcript: TranscriptSource
+    dedup_report: Optional[Dict]
+    template_text: str
+    plan: GenerationPlan
+    max_tokens: int
+    fingerprint: str
+
+
+def _prepare_request(
+    subject: str,
+    company: str,
+    participants: str,
+    transcript: TranscriptSource,
+    summary_points: str,
+    opening_style: str,
+    opening_context: str,
+    paragraphs: int,
+    model: str,
+    max_tokens: Optional[int],
+    cascade: bool,
+    cascade_checks: Optional[List[str]],
+    template_mode: str,
+    dedupe: bool,
+    fix_terms: bool,
+    hedge_model: Optional[str] = None,
+    max_repair_rounds: int = 0
+) -> PreparedRequest:
+    """
+    呼叫 API 前的共用準備（generate_article 與 agenerate_article 共用，確保快取指紋一致）
 
-    # === 解析受訪者 ===
+    - 解析模型與受訪者、讀取上傳檔案、移除重複段落、載入模板、token 預算規劃
+    - 快取指紋以原始逐字稿（上傳的長檔案為內容雜湊）計算，不需先摘要
+    - hedge_model／max_repair_rounds 為實際生效的設定（未啟用時分別傳 None／0）
+    """
+    selected_model, cascade = _resolve_model(model, cascade)
     participants_info = _parse_participants(participants)
     participants_desc = _format_participants(participants_info)
 
-    # === 長逐字稿模式 ===
-    transcript_length = _count_chars(transcript)
-    safe_mode = transcript_length > TRANSCRIPT_LENGTH_THRESHOLD
-    compressed_transcript = transcript
+    # === 上傳檔案與重複段落 ===
+    transcript, transcript_key = _load_transcript(transcript, dedupe)
+    dedup_report = None
+    if dedupe:
+        transcript, dedup_report = _dedupe_transcript(transcript)
 
-    if safe_mode:
-        print(f"⚠️ 啟用長逐字稿安全模式（約 {transcript_length} 字）")
-        compressed_transcript = summarize_long_transcript(transcript, SUMMARY_MODEL, api_key)
+    template_text = _load_article_template(template_mode)
+
+    # === Token 預算規劃 ===
+    plan = _plan_request(
+        CASCADE_TIERS[0] if cascade else selected_model,
+        subject, company, paragraphs, opening_style, opening_context,
+        participants_desc, transcript, summary_points, template_text, template_mode,
+    )
+    if max_tokens is None:
+        max_tokens = plan["max_tokens"]
+
+    fingerprint = _article_fingerprint(
+        subject=subject,
+        company=company,
+        participants=participants,
+        transcript=transcript_key,
+        summary_points=summary_points,
+        opening_style=opening_style,
+        opening_context=opening_context,
+        paragraphs=paragraphs,
+        template_text=template_text,
+        selected_model=selected_model,
+        cascade_checks=(cascade_checks or DEFAULT_CASCADE_CHECKS) if cascade else None,
+        max_tokens=max_tokens,
+        fix_terms=fix_terms,
+        dedupe=dedupe,
+        hedge_model=hedge_model,
+        max_repair_rounds=max_repair_rounds,
+    )
+    return {
+        "selected_model": selected_model,
+        "cascade": cascade,
+        "participants_info": participants_info,
+        "participants_desc": participants_desc,
+        "transcript": transcript,
+        "dedup_report": dedup_report,
+        "template_text": template_text,
+        "plan": plan,
+        "max_tokens": max_tokens,
+        "fingerprint": fingerprint,
+    }
+
+
+def plan_article(
+    subject: str,
+    company: str,
+    participants: str,
+    transcript: TranscriptSource,
+    summary_points: str,
+    opening_style: str,
+    opening_context: str,
+    paragraphs: int,
+    model: str = DEFAULT_MODEL,
+    template_mode: str = TEMPLATE_MODE_VERBOSE,
+    dedupe: bool = False
+) -> GenerationPlan:
+    """
+    生成前的 token 預算規劃（不呼叫 API）
+
+    回傳各部分 tokens、建議 max_tokens、逐字稿處理模式與預估成本／延遲，
+    供 UI 在按下生成前顯示。上傳的 TranscriptFile 逐行計算，不讀入全文。
+    """
+    selected_model, cascade = _resolve_model(model)
+    participants_desc = _format_participants(_parse_participants(participants))
+    if dedupe:
+        transcript, _ = _dedupe_transcript(_read_transcript(transcript))
+    template_text = _load_article_template(template_mode)
+    return _plan_request(
+        CASCADE_TIERS[0] if cascade else selected_model,
+        subject, company, paragraphs, opening_style, opening_context,
+        participants_desc, transcript, summary_points, template_text, template_mode,
+    )
+
+
+def _plan_request(
+    model: str,
+    subject: str,
+    company: str,
+    paragraphs: int,
+    opening_style: str,
+    opening_context: str,
+    participants_desc: str,
+    transcript: TranscriptSource,
+    summary_points: str,
+    template_text: str,
+    template_mode: str
+) -> GenerationPlan:
+    """以實際提示詞各部分計算 token 預算"""
+    scaffold = _build_user_prompt(
+        subject, company, paragraphs, opening_style, opening_context,
+        participants_desc, "", summary_points, "",
+        compact=template_mode == TEMPLATE_MODE_COMPACT,
+    )
+    plan = plan_generation(
+        model=model,
+        paragraphs=paragraphs,
+        system_prompt=SYSTEM_PROMPT,
+        template_text=template_text,
+        transcript=transcript,
+        prompt_scaffold=scaffold,
+        transcript_threshold=TRANSCRIPT_LENGTH_THRESHOLD,
+        segment_length=MAX_SEGMENT_LENGTH,
+        summary_model=SUMMARY_MODEL,
+        max_tokens_cap=MAX_TOKENS_SAFE_MODE,
+    )
+    print(f"📊 預算規劃：{plan['mode']}，輸入約 {plan['prompt_tokens']} tokens，max_tokens={plan['max_tokens']}")
+    return plan
+
+
+def _load_transcript(transcript: TranscriptSource, dedupe: bool = False) -> Tuple[TranscriptSource, str]:
+    """
+    取得逐字稿，回傳（逐字稿, 快取指紋用的逐字稿）
+
+    上傳檔案超過摘錄模式上限時必定走摘要模式，保留為 TranscriptFile，
+    快取未命中後才逐行串流分段摘要，記憶體用量與檔案長度無關（指紋改用檔案內容雜湊）；
+    較短的檔案，或需要全文比對的 dedupe，才讀入全文。
+    """
+    if isinstance(transcript, str):
+        return transcript, transcript
+    if dedupe or transcript.char_count() <= TRANSCRIPT_LENGTH_THRESHOLD * EXTRACTIVE_RATIO:
+        text = transcript.read()
+        return text, text
+    return transcript, f"sha256:{transcript.digest()}"
+
+
+def _read_transcript(transcript: TranscriptSource) -> str:
+    return transcript if isinstance(transcript, str) else transcript.read()
+
+
+def _dedupe_transcript(transcript: str) -> Tuple[str, Dict]:
+    """移除近似重複段落，回傳（處理後逐字稿, 統計）"""
+    result = dedupe_transcript(transcript, segment_length=MAX_SEGMENT_LENGTH)
+    report = {k: v for k, v in result.items() if k != "text"}
+    print(f"🧹 移除重複段落 {report['removed_passages']}/{report['passages']} 段，"
+          f"省下 {report['saved_chars']} 字、{report['saved_segments']} 個摘要分段")
+    return result["text"], report
 
-    # === 載入模板 ===
+
+def _prepare_transcript(
+    plan: GenerationPlan,
+    transcript: TranscriptSource,
+    participants_info: List[ParticipantInfo]
+) -> TranscriptSource:
+    """
+    依規劃模式處理逐字稿（摘錄模式於本地挑選重點段落，不呼叫 API）
+
+    摘錄結果為空時改為摘要模式（plan["mode"] 會更新為 summarize），由呼叫端進行摘要。
+    """
+    if plan["mode"] != MODE_EXTRACTIVE:
+        return transcript
+    print(f"✂️ 啟用摘錄模式（約 {_count_chars(transcript)} 字 → {TRANSCRIPT_LENGTH_THRESHOLD} 字內）")
+    extract = extract_key_passages(
+        transcript,
+        TRANSCRIPT_LENGTH_THRESHOLD,
+        [p["name"] for p in participants_info],
+    )
+    if not extract:
+        print("⚠️ 摘錄結果為空，改用分段摘要")
+        plan["mode"] = MODE_SUMMARIZE
+        return transcript
+    return extract
+
+
+def _resolve_model(model: str, cascade: bool = False) -> Tuple[str, bool]:
+    """解析模型別名，回傳（實際模型, 是否為分級模式）"""
+    selected_model = MODEL_ALIAS.get(model, DEFAULT_MODEL)
+    cascade = cascade or model == CASCADE_ALIAS
+    if cascade:
+        selected_model = " → ".join(CASCADE_TIERS)
+    print(f"🧠 模型選擇：{model} → {selected_model}")
+    return selected_model, cascade
+
+
+def _load_article_template(template_mode: str = TEMPLATE_MODE_VERBOSE) -> str:
+    """
+    載入文章模板（失敗時統一拋出「模板載入失敗」）
+
+    - verbose：原始模板
+    - compact：移除註解、分隔線與和 SYSTEM_PROMPT 重複的指示
+    """
     try:
         template_text = load_template("article_template.txt")
-        template_length = len(template_text)
-        print(f"✅ 模板載入成功（約 {template_length} 字）")
+        print(f"✅ 模板載入成功（約 {len(template_text)} 字）")
     except Exception as e:
         raise Exception(f"模板載入失敗：{str(e)}")
 
-    # === 強化的 System Prompt ===
-    system_prompt = """你是一位資深專訪作者，熟悉商業、教育、與公共議題報導。
+    if template_mode == TEMPLATE_MODE_COMPACT:
+        compiled = compile_template(template_text, SYSTEM_PROMPT)
+        print(f"🗜️ 精簡模板：{compiled['original_tokens']} → {compiled['tokens']} tokens")
+        return compiled["text"]
+    return template_text
 
-【核心要求】
-1. 必須嚴格遵循「文章模板」的所有指示與結構規範
-2. 全文字數控制在 1500–2000 字
-3. 文章結構：開場 → 主體段落 → 結語
-4. 每段至少包含一則直接引言，使用全形引號「」
-5. 所有引言與資訊均須來自逐字稿，不得捏造
-6. 語氣專業、自然、具溫度與觀察性
-7. 每個段落需要加上簡潔精煉的小標題（## 格式）
-8. 段落節奏需保持輕重有致，避免平鋪直敘
 
-【語言要求】
-- 使用台灣慣用語，避免中國大陸用語
-- 統一使用：公部門、使用者、網路、高品質、實際導入、整合、領域、管理、提升效率
-- 避免使用：互聯網、高質量、落地、打通、賽道、管控、提效、增量
+def _article_fingerprint(
+    template_text: str,
+    selected_model: str,
+    max_tokens: int,
+    **inputs
+) -> str:
+    """計算生成請求的快取指紋（文章輸入 + 模板雜湊 + 模型 + 取樣參數）"""
+    return request_fingerprint(
+        **inputs,
+        template=text_hash(template_text),
+        model=selected_model,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE,
+        top_p=TOP_P,
+    )
 
-【寫作原則】
-- 以第三人稱旁白撰寫
-- 保持專業中性，不使用推銷語氣
-- 用具體細節取代抽象形容
-- 段落開頭具轉場語，避免連續以引言開頭
-
-請完全按照「文章模板」的詳細規範執行。"""
 
-    # === 優化的 User Prompt ===
-    user_prompt = f"""請根據以下資訊撰寫完整專訪文章。
+def _build_user_prompt(
+    subject: str,
+    company: str,
+    paragraphs: int,
+    opening_style: str,
+    opening_context: str,
+    participants_desc: str,
+    transcript: str,
+    summary_points: str,
+    template_text: str,
+    compact: bool = False
+) -> str:
+    """組合 User Prompt（compact=True 時省略重複的檢查清單與分隔線）"""
+    header = f"""請根據以下資訊撰寫完整專訪文章。
 
 【文章資訊】
 主題：{subject}
@@ -131,10 +552,21 @@ def generate_article(
 {participants_desc}
 
 【逐字稿內容】
-{compressed_transcript}
+{transcript}
 
 【重點摘要】
-{summary_points or '（無重點摘要）'}
+{summary_points or '（無重點摘要）'}"""
+
+    if compact:
+        # 精簡模式：模板已含格式與檢查要求，不再附加重複的檢查清單
+        return f"""{header}
+
+【文章模板】
+{template_text}
+
+現在請開始撰寫完整文章。"""
+
+    return f"""{header}
 
 ========================================
 【文章模板 - 請嚴格遵循】
@@ -155,29 +587,39 @@ def generate_article(
 
 現在請開始撰寫完整文章。"""
 
-    # === 呼叫 Chat Completions API ===
-    client = OpenAI(api_key=api_key)
-    
+
+def _complete_with_retries(
+    client: OpenAI,
+    api_key: str,
+    model: str,
+    hedge_model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    usage: Dict,
+    hedge: bool,
+    accept,
+    hedge_policy: Optional[HedgePolicy] = None
+) -> Tuple[str, Optional[Dict], int]:
+    """呼叫 API 取得文章（失敗時重試），回傳（文章, 對沖資訊, 重試次數）"""
     for attempt in range(MAX_API_ATTEMPTS):
         try:
-            print(f"🔄 嘗試生成文章（第 {attempt + 1}/{MAX_API_ATTEMPTS} 次）")
-            
-            response = client.chat.completions.create(
-                model=selected_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=TEMPERATURE,
-                top_p=TOP_P,
-                max_tokens=min(max_tokens, 16000),
-            )
+            print(f"🔄 嘗試生成文章（{model}，第 {attempt + 1}/{MAX_API_ATTEMPTS} 次）")
 
-            article = response.choices[0].message.content.strip()
-            checks = quality_check(article, paragraphs, participants_info)
-            
-            print(f"✅ 文章生成成功（字數：{_count_chars(article)}）")
-            return article, checks, attempt
+            if hedge:
+                article, hedge_info = _hedged_completion(
+                    api_key, model, hedge_model,
+                    system_prompt, user_prompt, max_tokens,
+                    accept=accept,
+                    policy=hedge_policy,
+                    usage=usage,
+                )
+                return article, hedge_info, attempt
+
+            article = _request_completion(
+                client, model, system_prompt, user_prompt, max_tokens, usage
+            )
+            return article, None, attempt
 
         except Exception as e:
             error_msg = str(e)
@@ -189,14 +631,153 @@ def generate_article(
     raise Exception("未預期錯誤：生成失敗")
 
 
-def summarize_long_transcript(transcript: str, model: str, api_key: str) -> str:
-    """長逐字稿摘要模式"""
+def _cascade_failures(article: str, checks: Dict, required: List[str]) -> List[str]:
+    """依設定的檢查項目（quality_check 與 analyze_article）列出未通過者"""
+    scores = {**analyze_article(article, word_range=(1500, 2500), min_quotes=4), **checks}
+    return [name for name in required if not scores.get(name, True)]
+
+
+def _request_completion(
+    client: OpenAI,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    usage: Optional[Dict] = None
+) -> str:
+    """呼叫 Chat Completions API 並回傳文章內容（usage 用於累計 token 用量）"""
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=TEMPERATURE,
+        top_p=TOP_P,
+        max_tokens=min(max_tokens, 16000),
+    )
+    if usage is not None and response.usage is not None:
+        usage["prompt_tokens"] += response.usage.prompt_tokens
+        usage["completion_tokens"] += response.usage.completion_tokens
+    return response.choices[0].message.content.strip()
+
+
+def _hedged_completion(
+    api_key: str,
+    model: str,
+    hedge_model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    accept,
+    policy: Optional[HedgePolicy] = None,
+    usage: Optional[Dict] = None
+) -> Tuple[str, Dict]:
+    """
+    以對沖模式呼叫 API
+
+    兩個請求皆以串流讀取：取消時停止讀取並關閉該請求的連線，伺服器端隨即停止生成，
+    落敗的請求不會在背景跑完（同步 client 的 close() 無法中斷進行中的請求）。
+    """
+    client = OpenAI(api_key=api_key)
+    handles = {"primary": _CancellableStream(), "hedge": _CancellableStream()}
+    try:
+        return run_hedged(
+            primary=lambda: _stream_completion(
+                client, model, system_prompt, user_prompt, max_tokens, handles["primary"], usage
+            ),
+            hedge=lambda: _stream_completion(
+                client, hedge_model, system_prompt, user_prompt, max_tokens, handles["hedge"], usage
+            ),
+            accept=accept,
+            cancel=lambda label: handles[label].cancel(),
+            policy=policy,
+        )
+    finally:
+        client.close()
+
+
+class _CancellableStream:
+    """可由其他執行緒取消的串流請求（取消時關閉連線，讀取端隨即中斷）"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def attach(self, stream) -> None:
+        with self._lock:
+            self._stream = stream
+            if self.cancelled.is_set():
+                stream.close()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            if self._stream is not None:
+                self._stream.close()
+
+
+def _stream_completion(
+    client: OpenAI,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    handle: _CancellableStream,
+    usage: Optional[Dict] = None
+) -> str:
+    """以串流呼叫 Chat Completions API 並組合文章內容（handle 被取消時拋出例外）"""
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=TEMPERATURE,
+        top_p=TOP_P,
+        max_tokens=min(max_tokens, 16000),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    handle.attach(stream)
+    parts = []
+    try:
+        for chunk in stream:
+            if handle.cancelled.is_set():
+                break
+            if chunk.usage is not None and usage is not None:
+                usage["prompt_tokens"] += chunk.usage.prompt_tokens
+                usage["completion_tokens"] += chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+    except Exception:
+        if not handle.cancelled.is_set():
+            raise
+    finally:
+        stream.close()
+    if handle.cancelled.is_set():
+        raise Exception("請求已取消")
+    return "".join(parts).strip()
+
+
+def summarize_long_transcript(
+    transcript: Union[str, Iterable[str]],
+    model: str,
+    api_key: str
+) -> str:
+    """
+    長逐字稿摘要模式
+
+    - transcript 可為完整文字或逐行的可迭代物件（例如 iter_transcript_lines），
+      分段以生成器逐段產出，不需一次保留所有段落
+    """
     client = OpenAI(api_key=api_key)
-    segments = _split_transcript(transcript, MAX_SEGMENT_LENGTH)
+    lines = io.StringIO(transcript) if isinstance(transcript, str) else transcript
     summaries = []
     
-    for idx, seg in enumerate(segments, 1):
-        print(f"🧩 正在摘要第 {idx} 段 / 共 {len(segments)} 段")
+    for idx, seg in enumerate(iter_segments(lines, MAX_SEGMENT_LENGTH), 1):
+        print(f"🧩 正在摘要第 {idx} 段")
         try:
             response = client.chat.completions.create(
                 model=model,
@@ -216,18 +797,238 @@ def summarize_long_transcript(transcript: str, model: str, api_key: str) -> str:
     return "\n\n".join(summaries)
 
 
+def regenerate_section(
+    article: str,
+    section_index: int,
+    subject: str,
+    company: str,
+    participants: str,
+    transcript: TranscriptSource,
+    paragraphs: int,
+    api_key: str,
+    model: str = DEFAULT_MODEL,
+    instruction: str = ""
+) -> Tuple[str, Dict]:
+    """
+    只重新生成文章中的單一小節
+
+    - section_index：0 為開場（主標題與導言），1 起為各 ## 小節
+    - 以全文大綱與前後小節作為脈絡，其餘小節維持原文
+
+    Returns:
+        (更新後的完整文章, 新的品質檢查結果)
+    """
+    sections = split_sections(article)
+    if not 0 <= section_index < len(sections):
+        raise ValueError(f"小節編號超出範圍：{section_index}（共 {len(sections)} 節）")
+
+    section_model = _section_model(model)
+    participants_info = _parse_participants(participants)
+    client = OpenAI(api_key=api_key)
+    parts = [s["text"] for s in sections]
+    parts[section_index:section_index + 1] = [_rewrite_span(
+        client, section_model, sections, section_index, section_index + 1,
+        instruction or "重寫本節，使敘事更具體、引言更精準，並與前後小節自然銜接。",
+        subject, company, _format_participants(participants_info),
+        _section_transcript(transcript, participants_info),
+    )]
+    article = "\n\n".join(p for p in parts if p)
+    return article, quality_check(article, paragraphs, participants_info)
+
+
+def repair_article(
+    article: str,
+    subject: str,
+    company: str,
+    participants: str,
+    transcript: TranscriptSource,
+    paragraphs: int,
+    api_key: str,
+    model: str = DEFAULT_MODEL,
+    max_rounds: int = MAX_REPAIR_ROUNDS
+) -> Tuple[str, Dict, List[Dict]]:
+    """
+    針對 quality_check 未通過的項目，只改寫有問題的小節
+
+    Returns:
+        (修補後文章, 新的品質檢查結果, 修補紀錄)
+    """
+    participants_info = _parse_participants(participants)
+    client = OpenAI(api_key=api_key)
+    return _repair_loop(
+        client, _section_model(model), article, paragraphs, participants_info,
+        subject, company, _format_participants(participants_info),
+        _section_transcript(transcript, participants_info), max_rounds,
+    )
+
+
+def _section_model(model: str) -> str:
+    """小節改寫使用的模型（分級模式使用較強的一級）"""
+    selected_model, cascade = _resolve_model(model)
+    return CASCADE_TIERS[-1] if cascade else selected_model
+
+
+def _section_transcript(transcript: TranscriptSource, participants_info: List[ParticipantInfo]) -> str:
+    """小節改寫時附上的逐字稿（過長時於本地摘錄重點；上傳檔案逐行讀取）"""
+    if not transcript:
+        raise ValueError("缺少逐字稿，無法改寫小節（引言必須以逐字稿為依據）")
+    if _transcript_chars(transcript) <= TRANSCRIPT_LENGTH_THRESHOLD:
+        return _read_transcript(transcript)
+    return extract_key_passages(
+        transcript, TRANSCRIPT_LENGTH_THRESHOLD, [p["name"] for p in participants_info]
+    )
+
+
+def _repair_loop(
+    client: OpenAI,
+    model: str,
+    article: str,
+    paragraphs: int,
+    participants_info: List[ParticipantInfo],
+    subject: str,
+    company: str,
+    participants_desc: str,
+    transcript: str,
+    max_rounds: int
+) -> Tuple[str, Dict, List[Dict]]:
+    """自動修補迴圈：每輪依未通過項目改寫對應小節，直到全數通過或達到輪數上限"""
+    main_names = [p["name"] for p in participants_info if p["weight"] == "1"]
+    repair_log = []
+
+    for round_no in range(1, max_rounds + 1):
+        checks = quality_check(article, paragraphs, participants_info)
+        failed = [name for name, passed in checks.items() if passed is False]
+        if not failed:
+            break
+
+        sections = split_sections(article)
+        tasks = merge_tasks(plan_repairs(sections, failed, paragraphs, main_names, FILLER_WORDS))
+        if not tasks:
+            break
+
+        parts = [s["text"] for s in sections]
+        for task in tasks:
+            print(f"🩹 第 {round_no} 輪修補：第 {task['start']}–{task['end'] - 1} 節（{task['check']}）")
+            try:
+                parts[task["start"]:task["end"]] = [_rewrite_span(
+                    client, model, sections, task["start"], task["end"], task["instruction"],
+                    subject, company, participants_desc, transcript,
+                )]
+            except Exception as e:
+                print(f"⚠️ 小節修補失敗：{e}")
+                continue
+            repair_log.append({
+                "round": round_no,
+                "sections": [task["start"], task["end"] - 1],
+                "check": task["check"],
+            })
+        repaired = "\n\n".join(p for p in parts if p)
+        if _count_failures(repaired, paragraphs, participants_info) > len(failed):
+            print("⚠️ 修補後未通過項目反而增加，保留修補前版本")
+            break
+        article = repaired
+
+    return article, quality_check(article, paragraphs, participants_info), repair_log
+
+
+def _count_failures(article: str, paragraphs: int, participants_info: List[ParticipantInfo]) -> int:
+    return sum(1 for passed in quality_check(article, paragraphs, participants_info).values() if passed is False)
+
+
+def _rewrite_span(
+    client: OpenAI,
+    model: str,
+    sections: List[Section],
+    start: int,
+    end: int,
+    instruction: str,
+    subject: str,
+    company: str,
+    participants_desc: str,
+    transcript: str
+) -> str:
+    """改寫 sections[start:end]，回傳新的小節文字"""
+    previous_text = sections[start - 1]["text"] if start > 0 else "（無）"
+    next_text = sections[end]["text"] if end < len(sections) else "（無）"
+    output_rule = "以 # 主標題開頭的開場段落" if start == 0 else "以 ## 小標題開頭的小節"
+
+    user_prompt = f"""請修訂以下專訪文章中的指定小節。
+
+【文章資訊】
+主題：{subject}
+企業/組織：{company}
+
+【受訪者資訊】
+{participants_desc}
+
+【全文大綱】（▶ 為需修訂的小節）
+{format_outline(sections, range(start, end))}
+
+【前一節】
+{previous_text}
+
+【需修訂的小節】
+{join_sections(sections[start:end])}
+
+【後一節】
+{next_text}
+
+【修訂要求】
+{instruction}
+
+【逐字稿內容】
+{transcript}
+
+請只輸出修訂後的內容（{output_rule}），不要輸出其他小節或任何說明。"""
+
+    text = _request_completion(client, model, SYSTEM_PROMPT, user_prompt, SECTION_MAX_TOKENS)
+    if text.startswith("```"):
+        text = "\n".join(line for line in text.splitlines() if not line.startswith("```")).strip()
+    if start > 0 and not text.startswith("## "):
+        raise Exception("改寫結果缺少 ## 小標題")
+    return text
+
+
+def _save_article(
+    store: ArticleStore,
+    article: str,
+    checks: Dict,
+    attempt: int,
+    subject: str,
+    company: str,
+    participants: str,
+    participants_info: List[ParticipantInfo],
+    paragraphs: int,
+    model: str,
+    fingerprint: str
+) -> None:
+    """保存至文章庫（失敗時只顯示警告，不影響生成結果）"""
+    quality = {name: passed for name, passed in checks.items() if isinstance(passed, bool)}
+    telemetry = {name: value for name, value in checks.items() if not isinstance(value, bool)}
+    telemetry["品質檢查"] = quality
+    meta = build_meta_json(
+        subject, company, "、".join(p["name"] for p in participants_info), participants, article,
+        {**analyze_article(article, word_range=(1500, 2500)), **quality}, attempt,
+        word_count_range=(1500, 2500), paragraphs=paragraphs,
+    )
+    try:
+        checks["文章編號"] = store.save(article, subject, company, model, meta, telemetry, fingerprint)
+        print(f"🗄️ 已保存至文章庫（#{checks['文章編號']}）")
+    except Exception as e:
+        print(f"⚠️ 文章庫保存失敗：{e}")
+
+
+def _save_to_cache(cache: ResponseCache, fingerprint: str, article: str, checks: Dict, attempt: int) -> None:
+    """寫入回應快取（失敗時只顯示警告，已生成的文章照常回傳）"""
+    try:
+        cache.set(fingerprint, article, checks, attempt)
+    except Exception as e:
+        print(f"⚠️ 快取寫入失敗：{e}")
+
+
 def _split_transcript(transcript: str, max_length: int) -> List[str]:
-    """將逐字稿分割成多個段落"""
-    lines = transcript.split("\n")
-    segments, buffer = [], ""
-    for line in lines:
-        buffer += line + "\n"
-        if len(buffer) > max_length:
-            segments.append(buffer.strip())
-            buffer = ""
-    if buffer.strip():
-        segments.append(buffer.strip())
-    return segments
+    """將逐字稿分割成多個段落（需要段落總數時使用；否則請直接用 iter_segments）"""
+    return list(iter_segments(io.StringIO(transcript), max_length))
 
 
 def _count_chars(text: str) -> int:
@@ -235,6 +1036,15 @@ def _count_chars(text: str) -> int:
     return len(text.replace(" ", "").replace("\n", ""))
 
 
+def _transcript_chars(transcript: TranscriptSource) -> int:
+    return transcript.char_count() if isinstance(transcript, TranscriptFile) else _count_chars(transcript)
+
+
+def participant_names(participants: str) -> List[str]:
+    """取得受訪者姓名（供編輯器比對姓名）"""
+    return [p["name"] for p in _parse_participants(participants)]
+
+
 def _parse_participants(participants: str) -> List[ParticipantInfo]:
     """解析受訪者資訊"""
     info = []
@@ -272,9 +1082,10 @@ def quality_check(
     word_count = _count_chars(article)
     checks["字數充足"] = 1500 <= word_count <= 2500
     main_names = [p["name"] for p in participants if p["weight"] == "1"]
-    checks["提及主軸人物"] = any(name in article for name in main_names) if main_names else True
-    filler_words = ["非常成功", "十分重要", "極為關鍵", "相當優秀", "令人感動", "展現非凡"]
-    checks["避免空泛詞彙"] = not any(word in article for word in filler_words)
+    found = {hit["category"] for hit in build_lexicon(tuple(main_names)).scan(article)}
+    checks["提及主軸人物"] = CATEGORY_NAME in found if main_names else True
+    checks["避免空泛詞彙"] = CATEGORY_FILLER not in found
+    checks["避免大陸用語"] = CATEGORY_BANNED not in found
     return checks
 
 
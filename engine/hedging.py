@@ -0,0 +1,169 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Optional, Set, Tuple, TypedDict
+
+# === 常數定義 ===
+DEFAULT_PERCENTILE = 95
+DEFAULT_HEDGE_DELAY = 45.0     # 樣本不足時使用的預設延遲（秒）
+MIN_HEDGE_DELAY = 5.0
+MAX_HEDGE_DELAY = 120.0
+HISTORY_SIZE = 100
+MIN_SAMPLES = 5
+
+
+class HedgeInfo(TypedDict):
+    fired: bool
+    winner: str
+    delay: float
+
+
+class HedgePolicy:
+    """
+    對沖請求策略
+
+    - 依近期完成延遲的百分位數決定何時發出第二個請求
+    - 累計對沖觸發與勝出次數，供遙測使用
+    - 可跨多次呼叫共用（執行緒安全）
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        default_delay: float = DEFAULT_HEDGE_DELAY,
+        min_delay: float = MIN_HEDGE_DELAY,
+        max_delay: float = MAX_HEDGE_DELAY,
+        history_size: int = HISTORY_SIZE,
+        min_samples: int = MIN_SAMPLES,
+    ):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hedges_fired": 0, "hedge_wins": 0}
+
+    def delay(self) -> float:
+        """計算目前的對沖延遲（秒）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        idx = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, min(self.max_delay, samples[idx]))
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def record_outcome(self, fired: bool, hedge_won: bool) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["hedges_fired"] += int(fired)
+            self._stats["hedge_wins"] += int(hedge_won)
+
+    def stats(self) -> Dict[str, float]:
+        """回傳遙測統計（含觸發率與勝出率）"""
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"] or 1
+        fired = stats["hedges_fired"] or 1
+        stats["fire_rate"] = round(stats["hedges_fired"] / requests, 3)
+        stats["win_rate"] = round(stats["hedge_wins"] / fired, 3)
+        return stats
+
+
+# 預設共用策略：讓延遲樣本在多次生成之間累積
+DEFAULT_HEDGE_POLICY = HedgePolicy()
+
+
+def run_hedged(
+    primary: Callable[[], str],
+    hedge: Callable[[], str],
+    accept: Callable[[str], bool],
+    cancel: Callable[[str], None],
+    policy: Optional[HedgePolicy] = None,
+) -> Tuple[str, HedgeInfo]:
+    """
+    執行對沖請求
+
+    - 先發出 primary；若超過延遲仍未完成，再發出 hedge
+    - 第一個通過 accept 的結果勝出，另一個請求透過 cancel 取消
+    - 兩者皆未通過時，回傳最先完成的結果；兩者皆失敗時拋出最後的錯誤
+
+    Args:
+        primary: 主要請求
+        hedge: 對沖請求（相同請求或較快模型）
+        accept: 結果是否合格（例如 quality_check 全數通過）
+        cancel: 取消指定請求（"primary" / "hedge"）
+        policy: 對沖策略，預設使用 DEFAULT_HEDGE_POLICY
+    """
+    policy = policy or DEFAULT_HEDGE_POLICY
+    delay = policy.delay()
+    executor = ThreadPoolExecutor(max_workers=2)
+    started: Dict[str, float] = {}
+    recorded: Set[str] = set()
+    record_lock = threading.Lock()
+
+    def record(label: str) -> None:
+        # 每個請求只記錄一次：被取消者在取消時記錄下限，之後結束時不再重複記錄
+        with record_lock:
+            if label in recorded:
+                return
+            recorded.add(label)
+        policy.record_latency(time.perf_counter() - started[label])
+
+    def timed(label: str, fn: Callable[[], str]) -> Callable[[], str]:
+        def runner() -> str:
+            started[label] = time.perf_counter()
+            result = fn()
+            record(label)
+            return result
+        return runner
+
+    futures = {executor.submit(timed("primary", primary)): "primary"}
+    done, _ = wait(futures, timeout=delay)
+    fired = not done
+    if fired:
+        print(f"⏱️ 主要請求超過 {delay:.1f} 秒未回應，發出對沖請求")
+        futures[executor.submit(timed("hedge", hedge))] = "hedge"
+
+    winner, fallback, last_error = None, None, None
+    pending = set(futures)
+    try:
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if accept(result):
+                    winner = (futures[future], result)
+                    break
+                if fallback is None:
+                    fallback = (futures[future], result)
+    finally:
+        # 取消仍在進行中的請求；已經過的時間是其延遲的下限，一併記錄，
+        # 否則最慢的尾端永遠不會進入樣本，對沖延遲會逐漸縮短
+        for future in pending:
+            label = futures[future]
+            if label in started:
+                record(label)
+            future.cancel()
+            cancel(label)
+        executor.shutdown(wait=False)
+
+    chosen = winner or fallback
+    if chosen is None:
+        raise last_error or Exception("對沖請求未取得任何結果")
+
+    label, result = chosen
+    policy.record_outcome(fired, label == "hedge")
+    if fired:
+        print(f"🏁 對沖結果：{label} 勝出")
+    return result, {"fired": fired, "winner": label, "delay": round(delay, 2)}
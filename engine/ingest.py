@@ -0,0 +1,206 @@
+import hashlib
+import io
+import re
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Union
+
+# === 常數定義 ===
+SUPPORTED_EXTENSIONS = (".txt", ".srt", ".vtt", ".docx")
+
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?；;…]*[。！？!?；;…]+|[^。！？!?；;…]+")
+_TIMESTAMP_PATTERN = re.compile(r"-->")
+_CUE_INDEX_PATTERN = re.compile(r"^\d+$")
+_TAG_PATTERN = re.compile(r"<[^>]+>|\{\\[^}]+\}")
+
+
+def iter_transcript_lines(file_obj: BinaryIO, filename: str) -> Iterator[str]:
+    """
+    逐行讀取逐字稿檔案（不一次載入整份內容）
+
+    - .txt：逐行解碼（支援 UTF-8 BOM）
+    - .srt / .vtt：略過序號、時間軸、WEBVTT 標頭與格式標籤，並合併重複字幕
+    - .docx：逐段讀取段落文字
+
+    Args:
+        file_obj: 二進位檔案物件（例如 Streamlit UploadedFile）
+        filename: 檔名，用於判斷格式
+
+    Raises:
+        ValueError: 不支援的檔案格式
+    """
+    ext = Path(filename).suffix.lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"不支援的檔案格式：{ext}（支援 {', '.join(SUPPORTED_EXTENSIONS)}）")
+
+    if ext == ".docx":
+        from docx import Document
+        for paragraph in Document(file_obj).paragraphs:
+            yield paragraph.text
+        return
+
+    text_stream = io.TextIOWrapper(file_obj, encoding="utf-8-sig", errors="replace", newline=None)
+    try:
+        if ext == ".txt":
+            for line in text_stream:
+                yield line.rstrip("\n")
+        else:
+            yield from _iter_caption_lines(text_stream, any_cue_id=ext == ".vtt")
+    finally:
+        # 避免 TextIOWrapper 被回收時連帶關閉呼叫端的檔案物件
+        text_stream.detach()
+
+
+def _iter_caption_lines(lines: Iterable[str], any_cue_id: bool = False) -> Iterator[str]:
+    """解析 SRT / VTT 字幕，只輸出字幕文字"""
+    previous = None
+    skipping_block = False
+
+    for line in _drop_cue_indexes(lines, any_cue_id):
+        if not line:
+            skipping_block = False
+            continue
+        if skipping_block:
+            continue
+        if line.startswith("WEBVTT"):
+            continue
+        if line.startswith(("NOTE", "STYLE", "REGION")):
+            skipping_block = True
+            continue
+        if _TIMESTAMP_PATTERN.search(line):
+            continue
+
+        text = _TAG_PATTERN.sub("", line).strip()
+        # 自動字幕常逐句重複前一行，僅保留一次
+        if text and text != previous:
+            yield text
+            previous = text
+
+
+def _drop_cue_indexes(lines: Iterable[str], any_cue_id: bool = False) -> Iterator[str]:
+    """
+    去除前後空白並略過字幕序號
+
+    序號只有在下一行是時間軸時才是序號，否則是字幕文字（例如只有「2025」的字幕）。
+    SRT 的序號為純數字；VTT（any_cue_id=True）的 cue 識別碼可為任意文字（例如 Teams 的 UUID），
+    緊接在時間軸之前的非空行一律視為識別碼。
+    """
+    held = None
+    for raw in lines:
+        line = raw.strip()
+        if held is not None:
+            if not _TIMESTAMP_PATTERN.search(line):
+                yield held
+            held = None
+        if _is_cue_id_candidate(line, any_cue_id):
+            held = line
+            continue
+        yield line
+    if held is not None:
+        yield held
+
+
+def _is_cue_id_candidate(line: str, any_cue_id: bool) -> bool:
+    if any_cue_id:
+        return bool(line) and not _TIMESTAMP_PATTERN.search(line)
+    return bool(_CUE_INDEX_PATTERN.match(line))
+
+
+def read_transcript(file_obj: BinaryIO, filename: str) -> str:
+    """讀取逐字稿檔案為完整文字"""
+    return "\n".join(iter_transcript_lines(file_obj, filename))
+
+
+class TranscriptFile:
+    """
+    上傳的逐字稿檔案（每次迭代都從頭逐行讀取，不保留合併後的全文）
+
+    - 可直接傳給 generate_article／plan_article：超長的檔案以串流分段摘要，
+      記憶體用量與檔案長度無關；較短或需要全文處理（例如去除重複段落）時才讀入全文
+    - char_count()／digest() 以單次串流計算後快取，供字數提示與快取指紋使用
+    """
+
+    def __init__(self, file_obj: BinaryIO, filename: str):
+        self.file_obj = file_obj
+        self.name = filename
+        self._chars = None
+        self._digest = None
+
+    def __iter__(self) -> Iterator[str]:
+        self.file_obj.seek(0)
+        return iter_transcript_lines(self.file_obj, self.name)
+
+    def __bool__(self) -> bool:
+        return self.char_count() > 0
+
+    def read(self) -> str:
+        return "\n".join(self)
+
+    def char_count(self) -> int:
+        """字數（不含空白與換行，與貼上逐字稿的計算方式相同）"""
+        if self._chars is None:
+            self._scan()
+        return self._chars
+
+    def digest(self) -> str:
+        """逐字稿內容的 SHA-256（與 read() 結果的雜湊相同）"""
+        if self._digest is None:
+            self._scan()
+        return self._digest
+
+    def _scan(self) -> None:
+        chars, sha = 0, hashlib.sha256()
+        for idx, line in enumerate(self):
+            chars += len(line.replace(" ", ""))
+            sha.update(("\n" if idx else "").encode("utf-8") + line.encode("utf-8"))
+        self._chars, self._digest = chars, sha.hexdigest()
+
+
+# 逐字稿來源：貼上的文字或上傳的檔案
+TranscriptSource = Union[str, TranscriptFile]
+
+
+def iter_segments(lines: Iterable[str], max_length: int) -> Iterator[str]:
+    """
+    將逐字稿逐行切分為不超過 max_length 的段落（生成器，逐段產出）
+
+    - 以行為單位累積，超過上限即產出一段
+    - 單行超過上限時，於句號等句尾標點處切開；單句仍過長則直接截斷
+    - 每個字元只處理常數次，整體為線性時間
+    """
+    parts, size = [], 0
+    for line in lines:
+        for piece in _split_long_line(line.rstrip("\n"), max_length):
+            piece_size = len(piece) + 1
+            if parts and size + piece_size > max_length:
+                segment = "\n".join(parts).strip()
+                if segment:
+                    yield segment
+                parts, size = [], 0
+            parts.append(piece)
+            size += piece_size
+
+    segment = "\n".join(parts).strip()
+    if segment:
+        yield segment
+
+
+def _split_long_line(line: str, max_length: int) -> Iterator[str]:
+    """將過長的單行依句尾標點切為多塊，每塊不超過 max_length"""
+    if len(line) <= max_length:
+        yield line
+        return
+
+    chunk, size = [], 0
+    for match in _SENTENCE_PATTERN.finditer(line):
+        sentence = match.group()
+        if size + len(sentence) > max_length and chunk:
+            yield "".join(chunk)
+            chunk, size = [], 0
+        while len(sentence) > max_length:
+            yield sentence[:max_length]
+            sentence = sentence[max_length:]
+        chunk.append(sentence)
+        size += len(sentence)
+
+    if chunk:
+        yield "".join(chunk)
@@ -0,0 +1,170 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+# === 詞彙分類 ===
+CATEGORY_FILLER = "filler"      # 空泛詞彙
+CATEGORY_BANNED = "banned"      # 大陸用語（附建議的台灣用語）
+CATEGORY_NAME = "name"          # 受訪者姓名
+CATEGORY_ALLOW = "allow"        # 例外詞（遮蔽與其重疊的命中）
+
+# === 預設詞庫 ===
+FILLER_WORDS = ["非常成功", "十分重要", "極為關鍵", "相當優秀", "令人感動", "展現非凡"]
+
+PREFERRED_TERMS = {
+    "互聯網": "網路",
+    "高質量": "高品質",
+    "落地": "實際導入",
+    "打通": "整合",
+    "賽道": "領域",
+    "管控": "管理",
+    "提效": "提升效率",
+    "增量": "成長",
+}
+
+ALLOWED_TERMS = ["落地窗", "落地生根", "落地扇", "呱呱落地"]
+
+
+class LexiconHit(TypedDict):
+    start: int
+    end: int
+    term: str
+    category: str
+    replacement: Optional[str]
+
+
+class Lexicon:
+    """
+    Aho-Corasick 多字串比對器
+
+    - 所有詞彙編譯成一棵含失敗連結的字典樹，單次線性掃描即可找出全部命中位置
+    - 掃描成本只與文字長度及命中數有關，不隨詞庫大小增加
+    - category 為 allow 的例外詞（例如「落地窗」）會遮蔽與其重疊的其他命中
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[List[int]] = [[]]    # 節點本身結束的詞彙
+        self._output: List[List[int]] = [[]]      # 含失敗連結後綴的所有詞彙
+        self._entries: List[Tuple[str, str, Optional[str]]] = []
+        self._compiled = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, term: str, category: str, replacement: Optional[str] = None) -> None:
+        """加入一個詞彙（加入後需重新編譯，下次掃描時自動進行）"""
+        if not term:
+            return
+        node = 0
+        for ch in term:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append([])
+                self._output.append([])
+                self._goto[node][ch] = child
+            node = child
+        self._terminal[node].append(len(self._entries))
+        self._entries.append((term, category, replacement))
+        self._compiled = False
+
+    def compile(self) -> None:
+        """以廣度優先建立失敗連結，並合併後綴節點的輸出"""
+        self._output[0] = list(self._terminal[0])
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output[child] = list(self._terminal[child])
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target
+                self._output[child] = self._terminal[child] + self._output[target]
+                queue.append(child)
+
+        self._compiled = True
+
+    def find_all(self, text: str) -> List[LexiconHit]:
+        """找出所有命中（可重疊），依結束位置排序"""
+        if not self._compiled:
+            self.compile()
+        goto, fail, output, entries = self._goto, self._fail, self._output, self._entries
+
+        hits: List[LexiconHit] = []
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in output[node]:
+                term, category, replacement = entries[idx]
+                hits.append({
+                    "start": pos - len(term) + 1,
+                    "end": pos + 1,
+                    "term": term,
+                    "category": category,
+                    "replacement": replacement,
+                })
+        return hits
+
+    def scan(self, text: str) -> List[LexiconHit]:
+        """找出所有命中，排除被例外詞遮蔽者，依起始位置排序"""
+        hits = self.find_all(text)
+        allowed = [(h["start"], h["end"]) for h in hits if h["category"] == CATEGORY_ALLOW]
+        result = [
+            h for h in hits
+            if h["category"] != CATEGORY_ALLOW
+            and not any(start < h["end"] and h["start"] < end for start, end in allowed)
+        ]
+        result.sort(key=lambda h: (h["start"], -h["end"]))
+        return result
+
+    def fix(self, text: str) -> Tuple[str, List[LexiconHit]]:
+        """
+        將有建議用語的命中替換掉（最左最長、不重疊），回傳（替換後文字, 實際替換的命中）
+        """
+        replaced: List[LexiconHit] = []
+        cursor = 0
+        for hit in self.scan(text):
+            if hit["replacement"] is None or hit["start"] < cursor:
+                continue
+            replaced.append(hit)
+            cursor = hit["end"]
+
+        parts, cursor = [], 0
+        for hit in replaced:
+            parts.append(text[cursor:hit["start"]])
+            parts.append(hit["replacement"])
+            cursor = hit["end"]
+        parts.append(text[cursor:])
+        return "".join(parts), replaced
+
+
+@lru_cache(maxsize=64)
+def build_lexicon(names: Tuple[str, ...] = ()) -> Lexicon:
+    """
+    建立預設詞庫（空泛詞彙、大陸用語、例外詞，加上受訪者姓名）
+
+    結果會被快取並在多執行緒間共用，取得後請勿再呼叫 add()。
+    """
+    lexicon = Lexicon()
+    for word in FILLER_WORDS:
+        lexicon.add(word, CATEGORY_FILLER)
+    for term, replacement in PREFERRED_TERMS.items():
+        lexicon.add(term, CATEGORY_BANNED, replacement)
+    for term in ALLOWED_TERMS:
+        lexicon.add(term, CATEGORY_ALLOW)
+    for name in names:
+        lexicon.add(name, CATEGORY_NAME)
+    lexicon.compile()
+    return lexicon
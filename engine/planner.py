@@ -0,0 +1,206 @@
+import math
+import re
+from typing import Iterable, Tuple, TypedDict, Union
+
+from engine.ingest import _split_long_line
+from engine.tokens import count_tokens
+
+# === 模型規格（價格：美元／百萬 tokens；速度為粗估的輸出 tokens／秒） ===
+MODEL_SPECS = {
+    "gpt-4o-mini": {
+        "context_window": 128000,
+        "max_output": 16384,
+        "input_price": 0.15,
+        "output_price": 0.60,
+        "tokens_per_second": 80,
+        "base_latency": 0.6,
+    },
+    "gpt-4o": {
+        "context_window": 128000,
+        "max_output": 16384,
+        "input_price": 2.50,
+        "output_price": 10.00,
+        "tokens_per_second": 50,
+        "base_latency": 0.9,
+    },
+}
+
+# === 輸出長度估算 ===
+CHARS_PER_PARAGRAPH = 400       # 模板建議每段 300–500 字
+FRAME_CHARS = 600               # 標題、開場與結語
+OUTPUT_TOKENS_PER_CHAR = 1.1
+OUTPUT_HEADROOM = 1.3
+MIN_COMPLETION_TOKENS = 2000
+
+# === 逐字稿處理模式 ===
+MODE_DIRECT = "direct"
+MODE_EXTRACTIVE = "extractive"
+MODE_SUMMARIZE = "summarize"
+EXTRACTIVE_RATIO = 2.0          # 逐字稿在門檻 2 倍以內時，以本地摘錄取代 API 摘要
+MODE_LABELS = {
+    MODE_DIRECT: "直接使用逐字稿",
+    MODE_EXTRACTIVE: "本地摘錄重點段落",
+    MODE_SUMMARIZE: "分段摘要（長逐字稿安全模式）",
+}
+SUMMARY_CALL_OVERHEAD = 60      # 每次摘要呼叫的提示詞 tokens
+SUMMARY_OUTPUT_TOKENS = 500
+
+
+class GenerationPlan(TypedDict):
+    model: str
+    mode: str
+    system_tokens: int
+    template_tokens: int
+    transcript_tokens: int
+    other_tokens: int
+    prompt_tokens: int
+    max_tokens: int
+    estimated_output_tokens: int
+    summary_calls: int
+    estimated_cost: float
+    estimated_latency: float
+
+
+def estimate_output_tokens(paragraphs: int) -> int:
+    """依段落數估算文章的輸出 tokens"""
+    chars = paragraphs * CHARS_PER_PARAGRAPH + FRAME_CHARS
+    return int(chars * OUTPUT_TOKENS_PER_CHAR)
+
+
+def plan_generation(
+    model: str,
+    paragraphs: int,
+    system_prompt: str,
+    template_text: str,
+    transcript: Union[str, Iterable[str]],
+    prompt_scaffold: str,
+    transcript_threshold: int,
+    segment_length: int,
+    summary_model: str,
+    max_tokens_cap: int
+) -> GenerationPlan:
+    """
+    生成前的 token 預算規劃（完全在本地計算，不呼叫 API）
+
+    - 分別計算系統提示、模板、逐字稿與其餘提示（資訊欄位、檢查清單）的 tokens
+    - 依段落數決定 max_tokens，並受模型輸出上限、剩餘 context 與 max_tokens_cap 限制
+    - 依逐字稿長度與 context 決定 direct／extractive／summarize 模式
+    - 估算成本（美元）與延遲（秒）
+    - transcript 可為逐行的可迭代物件（例如 TranscriptFile），逐行計算不需讀入全文
+
+    Args:
+        transcript_threshold: 直接送出逐字稿的字數上限
+        segment_length: 摘要模式每段字數
+        max_tokens_cap: max_tokens 上限
+    """
+    spec = MODEL_SPECS.get(model, MODEL_SPECS["gpt-4o"])
+    summary_spec = MODEL_SPECS.get(summary_model, MODEL_SPECS["gpt-4o"])
+
+    system_tokens = count_tokens(system_prompt, model)
+    template_tokens = count_tokens(template_text, model)
+    transcript_tokens, transcript_chars, transcript_length = _measure_transcript(transcript, model)
+    other_tokens = count_tokens(prompt_scaffold, model)
+
+    estimated_output = estimate_output_tokens(paragraphs)
+    max_tokens = max(MIN_COMPLETION_TOKENS, int(estimated_output * OUTPUT_HEADROOM))
+    max_tokens = min(max_tokens, spec["max_output"], max_tokens_cap)
+
+    # === 模式判斷 ===
+    fixed_tokens = system_tokens + template_tokens + other_tokens
+    fits_context = fixed_tokens + transcript_tokens + max_tokens <= spec["context_window"]
+
+    summary_calls = 0
+    if transcript_chars <= transcript_threshold and fits_context:
+        mode = MODE_DIRECT
+        prompt_transcript_tokens = transcript_tokens
+    elif transcript_chars <= transcript_threshold * EXTRACTIVE_RATIO and fits_context:
+        mode = MODE_EXTRACTIVE
+        prompt_transcript_tokens = int(transcript_tokens * transcript_threshold / transcript_chars)
+    else:
+        mode = MODE_SUMMARIZE
+        summary_calls = max(1, math.ceil(transcript_length / segment_length))
+        prompt_transcript_tokens = summary_calls * SUMMARY_OUTPUT_TOKENS
+
+    prompt_tokens = fixed_tokens + prompt_transcript_tokens
+    max_tokens = max(0, min(max_tokens, spec["context_window"] - prompt_tokens))
+
+    # === 成本與延遲 ===
+    cost = (prompt_tokens * spec["input_price"] + estimated_output * spec["output_price"]) / 1_000_000
+    latency = spec["base_latency"] + estimated_output / spec["tokens_per_second"]
+    if summary_calls:
+        summary_input = transcript_tokens + summary_calls * SUMMARY_CALL_OVERHEAD
+        summary_output = summary_calls * SUMMARY_OUTPUT_TOKENS
+        cost += (summary_input * summary_spec["input_price"]
+                 + summary_output * summary_spec["output_price"]) / 1_000_000
+        latency += summary_calls * (
+            summary_spec["base_latency"] + SUMMARY_OUTPUT_TOKENS / summary_spec["tokens_per_second"]
+        )
+
+    return {
+        "model": model,
+        "mode": mode,
+        "system_tokens": system_tokens,
+        "template_tokens": template_tokens,
+        "transcript_tokens": prompt_transcript_tokens,
+        "other_tokens": other_tokens,
+        "prompt_tokens": prompt_tokens,
+        "max_tokens": max_tokens,
+        "estimated_output_tokens": estimated_output,
+        "summary_calls": summary_calls,
+        "estimated_cost": round(cost, 4),
+        "estimated_latency": round(latency, 1),
+    }
+
+
+def _measure_transcript(transcript: Union[str, Iterable[str]], model: str) -> Tuple[int, int, int]:
+    """回傳逐字稿的（tokens, 字數（不含空白與換行）, 總長度）"""
+    if isinstance(transcript, str):
+        return count_tokens(transcript, model), len(transcript.replace(" ", "").replace("\n", "")), len(transcript)
+    tokens = chars = length = 0
+    for line in transcript:
+        tokens += count_tokens(line, model)
+        chars += len(line.replace(" ", ""))
+        length += len(line) + 1
+    return tokens, chars, max(0, length - 1)
+
+
+def extract_key_passages(
+    transcript: Union[str, Iterable[str]],
+    max_chars: int,
+    priority_terms: Iterable[str] = ()
+) -> str:
+    """
+    本地摘錄模式：挑選最有資訊量的行，直到達到字數上限
+
+    - 含引號、數字或受訪者姓名的行優先保留
+    - 保留原始順序與原文用字；超過上限的長行（例如沒有換行的貼上內容）先依句尾標點切開
+    - transcript 可為逐行的可迭代物件（例如 TranscriptFile）
+    """
+    source = transcript.splitlines() if isinstance(transcript, str) else transcript
+    lines = [
+        piece.strip()
+        for line in source
+        for piece in _split_long_line(line.strip(), max_chars)
+        if piece.strip()
+    ]
+    terms = [t for t in priority_terms if t]
+
+    def score(line: str) -> int:
+        value = 0
+        if "「" in line or "」" in line:
+            value += 2
+        if re.search(r"\d", line):
+            value += 1
+        value += sum(1 for t in terms if t in line)
+        return value
+
+    ranked = sorted(range(len(lines)), key=lambda i: (-score(lines[i]), i))
+    picked, used = [], 0
+    for idx in ranked:
+        length = len(lines[idx])
+        if used + length > max_chars:
+            continue
+        picked.append(idx)
+        used += length
+
+    return "\n".join(lines[i] for i in sorted(picked))
@@ -3,9 +3,14 @@ import json
 from io import BytesIO
 from docx import Document
 
+from engine.lexicon import build_lexicon
 
-def sanitize_markdown(md: str) -> str:
-    """基本清理：行尾空白、多餘空行、引號、標題前空行等"""
+
+def sanitize_markdown(md: str, fix_terms: bool = False) -> str:
+    """
+    基本清理：行尾空白、多餘空行、引號、標題前空行等
+    - fix_terms：一併將大陸用語替換為台灣用語（依 engine/lexicon.py 詞庫，例外詞不替換）
+    """
     if not md:
         return ""
     
@@ -23,6 +28,10 @@ def sanitize_markdown(md: str) -> str:
     
     # 確保每個標題（#/##/### ）前有一個空行（檔首除外）
     md = re.sub(r"([^\n])\n(#{1,3} )", r"\1\n\n\2", md)
+
+    # 大陸用語 → 台灣用語
+    if fix_terms:
+        md, _ = build_lexicon().fix(md)
     
     return md.strip()
 
@@ -160,6 +169,8 @@ def build_docx_from_markdown(md: str) -> bytes:
     支援：標題(#/##/###)、段落、空行
     """
     doc = Document()
+    # 標題樣式只查一次（add_heading 每次都以名稱搜尋樣式表，批次匯出時是主要成本）
+    heading_styles = {level: doc.styles[f"Heading {level}"] for level in (1, 2, 3)}
     
     for raw in md.splitlines():
         line = raw.rstrip()
@@ -168,11 +179,11 @@ def build_docx_from_markdown(md: str) -> bytes:
             continue
         
         if line.startswith("### "):
-            doc.add_heading(line[4:].strip(), level=3)
+            doc.add_paragraph(line[4:].strip(), style=heading_styles[3])
         elif line.startswith("## "):
-            doc.add_heading(line[3:].strip(), level=2)
+            doc.add_paragraph(line[3:].strip(), style=heading_styles[2])
         elif line.startswith("# "):
-            doc.add_heading(line[2:].strip(), level=1)
+            doc.add_paragraph(line[2:].strip(), style=heading_styles[1])
         else:
             doc.add_paragraph(line)
     
@@ -181,6 +192,12 @@ def build_docx_from_markdown(md: str) -> bytes:
     return buf.getvalue()
 
 
+def build_plain_text(md: str) -> str:
+    """Markdown -> 純文字（移除標題符號與粗體標記）"""
+    text = re.sub(r"^#{1,6}\s+", "", md, flags=re.MULTILINE)
+    return text.replace("**", "")
+
+
 def build_meta_json(
     subject: str,
     company: str,
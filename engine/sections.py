@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, List, TypedDict
+
+from engine.lexicon import CATEGORY_BANNED, build_lexicon
+
+# === 常數定義 ===
+TARGET_SECTION_CHARS = 400
+MIN_ARTICLE_CHARS = 1500
+MAX_ARTICLE_CHARS = 2500
+
+
+class Section(TypedDict):
+    heading: str     # 「## 小標題」整行；開場（主標題與導言）為空字串
+    text: str        # 含標題行的完整內容
+
+
+class RepairTask(TypedDict):
+    start: int       # 要改寫的小節範圍 [start, end)
+    end: int
+    check: str
+    instruction: str
+
+
+def split_sections(article: str) -> List[Section]:
+    """
+    以 ## 小標題切分文章
+
+    第 0 節為開場（# 主標題與第一個 ## 之前的內容），其後每節以 ## 行開頭。
+    """
+    sections: List[Section] = []
+    heading, lines = "", []
+    for line in article.splitlines():
+        if line.startswith("## "):
+            sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+            heading, lines = line.strip(), []
+        lines.append(line)
+    sections.append({"heading": heading, "text": "\n".join(lines).strip()})
+    return sections
+
+
+def join_sections(sections: Iterable[Section]) -> str:
+    """將小節組回完整文章"""
+    return "\n\n".join(s["text"] for s in sections if s["text"])
+
+
+def format_outline(sections: List[Section], highlight: Iterable[int] = ()) -> str:
+    """列出全文大綱，需修改的小節以 ▶ 標示"""
+    marks = set(highlight)
+    lines = []
+    for idx, section in enumerate(sections):
+        title = section["heading"][3:] if section["heading"] else "（開場）"
+        lines.append(f"{'▶' if idx in marks else '-'} {idx}. {title}")
+    return "\n".join(lines)
+
+
+def _char_count(text: str) -> int:
+    return len(text.replace(" ", "").replace("\n", ""))
+
+
+def plan_repairs(
+    sections: List[Section],
+    failed: List[str],
+    expected_paragraphs: int,
+    main_names: List[str],
+    filler_words: List[str]
+) -> List[RepairTask]:
+    """
+    依未通過的 quality_check 項目，找出需要修補的小節與修改指示
+
+    - 包含主標題：修補開場
+    - 避免空泛詞彙：含空泛詞的小節
+    - 避免大陸用語：含大陸用語的小節（附建議的台灣用語）
+    - 包含引言：缺少「」引言的小節
+    - 提及主軸人物：第一個主體小節
+    - 字數充足：過短時擴寫最短的小節，過長時精簡最長的小節
+    - 段落數符合：過少時拆分最長的小節，過多時合併最短的小節與前一節
+    """
+    body = list(range(1, len(sections)))
+    by_length = sorted(body, key=lambda i: _char_count(sections[i]["text"]))
+    tasks: List[RepairTask] = []
+
+    def add(start: int, end: int, check: str, instruction: str) -> None:
+        tasks.append({"start": start, "end": end, "check": check, "instruction": instruction})
+
+    for check in failed:
+        if check == "包含主標題":
+            add(0, 1, check, "在開頭加上一行以 # 開頭的主標題，其餘內容保持不變。")
+
+        elif check == "避免空泛詞彙":
+            for idx, section in enumerate(sections):
+                words = [w for w in filler_words if w in section["text"]]
+                if words:
+                    add(idx, idx + 1, check,
+                        f"刪除空泛詞彙（{'、'.join(words)}），改以具體細節、數據或行動描述取代。")
+
+        elif check == "避免大陸用語":
+            for idx, section in enumerate(sections):
+                hits = [h for h in build_lexicon().scan(section["text"]) if h["category"] == CATEGORY_BANNED]
+                if hits:
+                    pairs = dict.fromkeys(f"{h['term']}→{h['replacement']}" for h in hits)
+                    add(idx, idx + 1, check, f"改用台灣慣用語（{'、'.join(pairs)}），語意保持不變。")
+
+        elif check == "包含引言":
+            for idx in body or [0]:
+                if "「" not in sections[idx]["text"]:
+                    add(idx, idx + 1, check, "加入至少一則逐字稿中的直接引言，使用全形引號「」。")
+
+        elif check == "提及主軸人物" and body:
+            add(body[0], body[0] + 1, check,
+                f"明確提及主軸人物（{'、'.join(main_names)}），並引用其觀點。")
+
+        elif check == "字數充足" and body:
+            total = sum(_char_count(s["text"]) for s in sections)
+            if total < MIN_ARTICLE_CHARS:
+                count = max(1, min(len(body), (MIN_ARTICLE_CHARS - total) // TARGET_SECTION_CHARS + 1))
+                for idx in by_length[:count]:
+                    add(idx, idx + 1, check,
+                        f"以逐字稿中的細節與引言擴寫本節，約 {TARGET_SECTION_CHARS} 字。")
+            elif total > MAX_ARTICLE_CHARS:
+                count = max(1, min(len(body), (total - MAX_ARTICLE_CHARS) // TARGET_SECTION_CHARS + 1))
+                for idx in by_length[-count:]:
+                    add(idx, idx + 1, check,
+                        f"精簡本節至約 {TARGET_SECTION_CHARS} 字，保留關鍵引言與事實。")
+
+        elif check == "段落數符合" and body:
+            if len(body) < expected_paragraphs:
+                idx = by_length[-1]
+                add(idx, idx + 1, check,
+                    "將本節拆成兩個小節，各自以 ## 開頭並有簡潔的小標題，內容不重複。")
+            elif len(body) > expected_paragraphs and len(body) >= 2:
+                idx = max(by_length[0], 2)
+                add(idx - 1, idx + 1, check,
+                    "將這兩個小節合併為一個小節，以一個 ## 小標題開頭，保留重要引言。")
+
+    return tasks
+
+
+def merge_tasks(tasks: List[RepairTask]) -> List[RepairTask]:
+    """
+    合併同一範圍的修補指示，並去除重疊的範圍
+
+    回傳依 start 由大到小排序，依序套用時前面的索引不會位移。
+    """
+    merged: Dict[tuple, RepairTask] = {}
+    for task in tasks:
+        key = (task["start"], task["end"])
+        if key in merged:
+            merged[key]["check"] += f"、{task['check']}"
+            merged[key]["instruction"] += f"\n{task['instruction']}"
+        else:
+            merged[key] = dict(task)
+
+    result: List[RepairTask] = []
+    for task in sorted(merged.values(), key=lambda t: (t["start"], -t["end"])):
+        if result and task["start"] < result[-1]["end"]:
+            continue   # 與前一個範圍重疊，留待下一輪
+        result.append(task)
+    return list(reversed(result))
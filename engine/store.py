@@ -0,0 +1,364 @@
+"""
+文章庫（SQLite）
+
+每次生成後保存文章、meta.json、輸入指紋與執行紀錄，
+以 FTS5（trigram 分詞，適用中文）全文搜尋內文，並為企業、主題、模型與日期建立索引；
+中文常見的 2 字詞另以二字詞（bigram）索引查詢。
+
+命令列：
+    python -m engine.store search 數位轉型 --company 台灣科技公司
+    python -m engine.store show 42
+    python -m engine.store stats
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, TypedDict
+
+# === 常數定義 ===
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "articles.db"
+DEFAULT_SEARCH_LIMIT = 20
+SNIPPET_TOKENS = 24
+MIN_MATCH_CHARS = 3     # trigram 分詞的最短查詢長度
+BIGRAM_CHARS = 2        # 2 字詞改查二字詞索引，其餘較短的詞以 LIKE 比對
+SNIPPET_CONTEXT = 20    # 二字詞查詢的摘要從命中位置前幾個字開始
+ORDER_RECENT = "recent"
+ORDER_RELEVANCE = "relevance"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id          INTEGER PRIMARY KEY,
+    created_at  TEXT NOT NULL,
+    company     TEXT NOT NULL,
+    subject     TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    fingerprint TEXT,
+    article     TEXT NOT NULL,
+    meta        TEXT NOT NULL,
+    telemetry   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_company ON articles(company, created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_subject ON articles(subject, created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_model ON articles(model, created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_created ON articles(created_at);
+CREATE INDEX IF NOT EXISTS idx_articles_fingerprint ON articles(fingerprint);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    subject, company, article,
+    content='articles', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, subject, company, article)
+    VALUES (new.id, new.subject, new.company, new.article);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, subject, company, article)
+    VALUES ('delete', old.id, old.subject, old.company, old.article);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, subject, company, article)
+    VALUES ('delete', old.id, old.subject, old.company, old.article);
+    INSERT INTO articles_fts(rowid, subject, company, article)
+    VALUES (new.id, new.subject, new.company, new.article);
+END;
+
+-- 二字詞索引：內容先以 bigrams() 切為以空白分隔的重疊二字詞，不另存原文
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_bigram USING fts5(
+    subject, company, article, content='', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS articles_bigram_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_bigram(rowid, subject, company, article)
+    VALUES (new.id, bigrams(new.subject), bigrams(new.company), bigrams(new.article));
+END;
+CREATE TRIGGER IF NOT EXISTS articles_bigram_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_bigram(articles_bigram, rowid, subject, company, article)
+    VALUES ('delete', old.id, bigrams(old.subject), bigrams(old.company), bigrams(old.article));
+END;
+CREATE TRIGGER IF NOT EXISTS articles_bigram_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_bigram(articles_bigram, rowid, subject, company, article)
+    VALUES ('delete', old.id, bigrams(old.subject), bigrams(old.company), bigrams(old.article));
+    INSERT INTO articles_bigram(rowid, subject, company, article)
+    VALUES (new.id, bigrams(new.subject), bigrams(new.company), bigrams(new.article));
+END;
+"""
+
+
+class StoredArticle(TypedDict):
+    id: int
+    created_at: str
+    company: str
+    subject: str
+    model: str
+    fingerprint: Optional[str]
+    article: str
+    meta: Dict
+    telemetry: Dict
+
+
+class SearchHit(TypedDict):
+    id: int
+    created_at: str
+    company: str
+    subject: str
+    model: str
+    snippet: str
+
+
+class ArticleStore:
+    """
+    SQLite 文章庫
+
+    - 每次操作各自開啟連線（WAL 模式），可在 Streamlit 多個工作階段與多執行緒間共用
+    - 內文以 FTS5 外部內容表建立全文索引，由觸發器同步
+    - 二字詞索引的觸發器使用 bigrams() 函式，寫入必須經由本類別的連線（_connect 會註冊）
+    """
+
+    def __init__(self, db_path: Path | str = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            has_bigram = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'articles_bigram'"
+            ).fetchone()
+            conn.executescript(SCHEMA)
+            if not has_bigram:
+                # 舊資料庫：補建二字詞索引
+                with conn:
+                    conn.execute(
+                        "INSERT INTO articles_bigram(rowid, subject, company, article) "
+                        "SELECT id, bigrams(subject), bigrams(company), bigrams(article) FROM articles"
+                    )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.create_function("bigrams", 1, _bigrams, deterministic=True)
+        return conn
+
+    def save(
+        self,
+        article: str,
+        subject: str,
+        company: str,
+        model: str,
+        meta: bytes | Dict,
+        telemetry: Optional[Dict] = None,
+        fingerprint: Optional[str] = None,
+        created_at: Optional[str] = None
+    ) -> int:
+        """保存一篇文章，回傳文章編號（meta 可直接傳入 build_meta_json 的結果）"""
+        if isinstance(meta, bytes):
+            meta = json.loads(meta.decode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO articles (created_at, company, subject, model, fingerprint, article, meta, telemetry) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    created_at or datetime.now().isoformat(timespec="seconds"),
+                    company, subject, model, fingerprint, article,
+                    json.dumps(meta, ensure_ascii=False),
+                    json.dumps(telemetry or {}, ensure_ascii=False),
+                ),
+            )
+            return cursor.lastrowid
+
+    def get(self, article_id: int) -> Optional[StoredArticle]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return _to_article(row) if row else None
+
+    def find_by_fingerprint(self, fingerprint: str) -> Optional[StoredArticle]:
+        """依輸入指紋找出最近一次的相同生成"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM articles WHERE fingerprint = ? ORDER BY created_at DESC LIMIT 1",
+                (fingerprint,),
+            ).fetchone()
+        return _to_article(row) if row else None
+
+    def search(
+        self,
+        query: str = "",
+        company: Optional[str] = None,
+        subject: Optional[str] = None,
+        model: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        order: str = ORDER_RECENT
+    ) -> List[SearchHit]:
+        """
+        搜尋文章
+
+        - query：以空白分隔的關鍵字（AND）；3 字以上走 trigram 索引，2 字詞走二字詞索引，
+          其餘（單字或含標點的 2 字）以 LIKE 比對
+        - company／subject／model：完全相符；since／until：ISO 日期（含）
+        - order：recent 依建立順序由新到舊（FTS5 可沿 rowid 提早結束）；
+          relevance 依 bm25 相關度（需為所有命中計分，常見詞較慢）
+        """
+        terms = query.split()
+        match_terms = [t for t in terms if len(t) >= MIN_MATCH_CHARS]
+        bigram_terms = [t for t in terms if len(t) == BIGRAM_CHARS and t.isalnum()]
+        like_terms = [t for t in terms if len(t) < MIN_MATCH_CHARS and t not in bigram_terms]
+        bigram_query = " ".join(_quote(t) for t in bigram_terms)
+
+        where, params = [], []
+        for column, value in (("company", company), ("subject", subject), ("model", model)):
+            if value:
+                where.append(f"a.{column} = ?")
+                params.append(value)
+        if since:
+            where.append("a.created_at >= ?")
+            params.append(since)
+        if until:
+            where.append("a.created_at < ?")
+            params.append(_next_day(until))
+        for term in like_terms:
+            where.append("(a.article LIKE ? OR a.subject LIKE ? OR a.company LIKE ?)")
+            params.extend([f"%{term}%"] * 3)
+
+        if match_terms:
+            if bigram_terms:
+                where.append("a.id IN (SELECT rowid FROM articles_bigram WHERE articles_bigram MATCH ?)")
+                params.append(bigram_query)
+            sql = (
+                "SELECT a.id, a.created_at, a.company, a.subject, a.model, "
+                f"snippet(articles_fts, 2, '【', '】', '…', {SNIPPET_TOKENS}) AS snippet "
+                "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                "WHERE articles_fts MATCH ?"
+            )
+            params.insert(0, " ".join(_quote(t) for t in match_terms))
+            sql += "".join(f" AND {clause}" for clause in where)
+            sql += " ORDER BY rank" if order == ORDER_RELEVANCE else " ORDER BY articles_fts.rowid DESC"
+            sql += " LIMIT ?"
+        elif bigram_terms:
+            # 二字詞索引不存原文，摘要取命中位置附近的內文並標示關鍵字
+            sql = (
+                "SELECT a.id, a.created_at, a.company, a.subject, a.model, "
+                f"replace(substr(a.article, max(1, instr(a.article, ?) - {SNIPPET_CONTEXT}), {SNIPPET_TOKENS * 4}), "
+                "?, '【' || ? || '】') AS snippet "
+                "FROM articles_bigram JOIN articles a ON a.id = articles_bigram.rowid "
+                "WHERE articles_bigram MATCH ?"
+            )
+            params[:0] = [bigram_terms[0]] * 3 + [bigram_query]
+            sql += "".join(f" AND {clause}" for clause in where)
+            sql += " ORDER BY rank" if order == ORDER_RELEVANCE else " ORDER BY articles_bigram.rowid DESC"
+            sql += " LIMIT ?"
+        else:
+            sql = (
+                "SELECT a.id, a.created_at, a.company, a.subject, a.model, "
+                f"substr(a.article, 1, {SNIPPET_TOKENS * 4}) AS snippet FROM articles a"
+            )
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY a.created_at DESC LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def delete(self, article_id: int) -> bool:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM articles WHERE id = ?", (article_id,)).rowcount > 0
+
+    def stats(self) -> Dict:
+        """文章總數，以及各企業、模型的篇數"""
+        with closing(self._connect()) as conn:
+            total = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            companies = conn.execute(
+                "SELECT company, COUNT(*) AS n FROM articles GROUP BY company ORDER BY n DESC LIMIT 10"
+            ).fetchall()
+            models = conn.execute("SELECT model, COUNT(*) AS n FROM articles GROUP BY model").fetchall()
+        return {
+            "total": total,
+            "companies": {row["company"]: row["n"] for row in companies},
+            "models": {row["model"]: row["n"] for row in models},
+        }
+
+
+def _to_article(row: sqlite3.Row) -> StoredArticle:
+    article = dict(row)
+    article["meta"] = json.loads(article["meta"])
+    article["telemetry"] = json.loads(article["telemetry"])
+    return article
+
+
+def _bigrams(text: Optional[str]) -> str:
+    """將文字切為重疊的二字詞（以空白分隔），標點與空白不構成二字詞"""
+    if not text:
+        return ""
+    return " ".join(a + b for a, b in zip(text, text[1:]) if a.isalnum() and b.isalnum())
+
+
+def _quote(term: str) -> str:
+    """將關鍵字包成 FTS5 片語，避免特殊字元被當成查詢語法"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _next_day(date: str) -> str:
+    """until 只給日期時包含當天整天"""
+    if len(date) > 10:
+        return date
+    return (datetime.fromisoformat(date) + timedelta(days=1)).date().isoformat()
+
+
+# === 命令列 ===
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="專訪文章庫查詢")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="資料庫路徑")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search_cmd = commands.add_parser("search", help="搜尋文章")
+    search_cmd.add_argument("query", nargs="*", help="關鍵字（以空白分隔）")
+    search_cmd.add_argument("--company")
+    search_cmd.add_argument("--subject")
+    search_cmd.add_argument("--model")
+    search_cmd.add_argument("--since", help="起始日期（YYYY-MM-DD）")
+    search_cmd.add_argument("--until", help="結束日期（YYYY-MM-DD）")
+    search_cmd.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT)
+    search_cmd.add_argument("--relevance", action="store_true", help="依相關度排序（預設由新到舊）")
+    search_cmd.add_argument("--json", action="store_true", help="以 JSON 輸出")
+
+    show_cmd = commands.add_parser("show", help="顯示文章全文")
+    show_cmd.add_argument("id", type=int)
+    show_cmd.add_argument("--meta", action="store_true", help="一併輸出 meta 與執行紀錄")
+
+    commands.add_parser("stats", help="文章庫統計")
+    args = parser.parse_args(argv)
+
+    store = ArticleStore(args.db)
+    if args.command == "search":
+        hits = store.search(
+            " ".join(args.query), company=args.company, subject=args.subject, model=args.model,
+            since=args.since, until=args.until, limit=args.limit,
+            order=ORDER_RELEVANCE if args.relevance else ORDER_RECENT,
+        )
+        if args.json:
+            print(json.dumps(hits, ensure_ascii=False, indent=2))
+            return
+        for hit in hits:
+            print(f"#{hit['id']}  {hit['created_at']}  {hit['company']}／{hit['subject']}（{hit['model']}）")
+            print(f"    {hit['snippet'].replace(chr(10), ' ')}")
+        print(f"共 {len(hits)} 筆", file=sys.stderr)
+
+    elif args.command == "show":
+        article = store.get(args.id)
+        if article is None:
+            sys.exit(f"❌ 找不到文章 #{args.id}")
+        print(article["article"])
+        if args.meta:
+            print(json.dumps({"meta": article["meta"], "telemetry": article["telemetry"]},
+                             ensure_ascii=False, indent=2))
+
+    else:
+        print(json.dumps(store.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
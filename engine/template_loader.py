@@ -1,5 +1,22 @@
 import os
+import re
 from pathlib import Path
+from typing import TypedDict
+
+from engine.tokens import count_tokens
+
+# === 模板精簡規則 ===
+_BANNER_PATTERN = re.compile(r"^\s*[=\-─]{3,}\s*$")
+_LIST_MARKER_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.、)]|\(\d+\)|[A-Z][.、])\s*")
+_NON_WORD_PATTERN = re.compile(r"[\W_]+")
+MIN_DEDUP_LENGTH = 6   # 過短的行不做去重，避免誤刪
+
+
+class CompiledTemplate(TypedDict):
+    text: str
+    tokens: int
+    original_tokens: int
+    saved_tokens: int
 
 def load_template(filename: str = "article_template.txt") -> str:
     """
@@ -46,3 +63,59 @@ def load_template(filename: str = "article_template.txt") -> str:
     )
     print(f"❌ {error_message}")
     raise Exception(error_message)
+
+
+def _normalize(line: str) -> str:
+    """去除列表編號、標點與空白，用於比對重複指示"""
+    return _NON_WORD_PATTERN.sub("", _LIST_MARKER_PATTERN.sub("", line))
+
+
+def compile_template(template_text: str, system_prompt: str = "") -> CompiledTemplate:
+    """
+    將模板編譯為精簡的標準形式
+
+    - 移除 # 註解行、===== 分隔線與空行
+    - 移除與 system_prompt 重複的指示，以及模板內重複出現的行
+    - 移除內容已被刪光的段落標題（【…】）
+    - 回傳精簡後文字與前後 token 數
+
+    Args:
+        template_text (str): 原始模板
+        system_prompt (str): 系統提示詞，與其重複的指示會被移除
+
+    Returns:
+        CompiledTemplate: 精簡模板與 token 統計
+    """
+    system_norm = _normalize(system_prompt)
+    seen = set()
+    lines = []
+
+    for raw in template_text.splitlines():
+        line = re.sub(r"[ \t]+", " ", raw).strip()
+        if not line or line.startswith("#") or _BANNER_PATTERN.match(line):
+            continue
+
+        norm = _normalize(line)
+        if not norm:
+            continue
+        if len(norm) >= MIN_DEDUP_LENGTH and (norm in seen or norm in system_norm):
+            continue
+        seen.add(norm)
+        lines.append(line)
+
+    # 移除沒有內容的段落標題
+    compact = [
+        line for idx, line in enumerate(lines)
+        if not (line.startswith("【") and (idx + 1 == len(lines) or lines[idx + 1].startswith("【")))
+    ]
+
+    text = "\n".join(compact)
+    original_tokens = count_tokens(template_text)
+    tokens = count_tokens(text)
+    return {
+        "text": text,
+        "tokens": tokens,
+        "original_tokens": original_tokens,
+        "saved_tokens": original_tokens - tokens,
+    }
+
@@ -0,0 +1,40 @@
+import re
+from functools import lru_cache
+
+# 無法載入 tiktoken 編碼表時的估算係數
+CJK_TOKENS_PER_CHAR = 1.0
+OTHER_CHARS_PER_TOKEN = 4.0
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(model: str):
+    """取得 tiktoken 編碼器；未安裝或無法下載編碼表時回傳 None"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"⚠️ 無法載入 tiktoken 編碼（{type(e).__name__}），改用字數估算")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    計算文字的 token 數
+
+    - 優先使用 tiktoken（與 API 計費一致）
+    - 無法使用時以字元估算：中日韓文字約 1 token／字，其他約 4 字元／token
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / OTHER_CHARS_PER_TOKEN + 0.5)
@@ -0,0 +1,389 @@
+"""
+雲端版（app/ui_public.py）壓力測試
+
+啟動一個真正的 Streamlit 伺服器（streamlit run），N 位虛擬使用者以 websocket
+同時連線並操作生成流程，與正式部署相同：所有工作階段共用一個伺服器行程、
+一個 GIL 與腳本執行緒。OpenAI API 以本機假端點取代（可設定延遲分布與同時處理上限）。
+
+執行：
+    python tools/load_test.py --users 1,2,4,8,16 --latency 2.0
+
+報表欄位：
+    users         同時使用者數
+    throughput    每秒完成的生成數
+    queue p50/p95 假端點的排隊延遲（等待處理名額）
+    e2e p50/p95/p99  按下生成到畫面完成的端到端延遲
+    mem/session   伺服器行程於該階段增加的常駐記憶體 ÷ 使用者數
+    server RSS    該階段結束時伺服器行程的常駐記憶體
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.request import urlopen
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+# === 常數定義 ===
+APP_PATH = PROJECT_ROOT / "app" / "ui_public.py"
+DEFAULT_USERS = "1,2,4,8"
+DEFAULT_LATENCY = 2.0       # 假端點回應延遲中位數（秒）
+DEFAULT_SIGMA = 0.4         # 對數常態分布的離散程度
+DEFAULT_CAPACITY = 8        # 假端點同時處理上限（模擬 API 速率限制）
+SERVER_START_TIMEOUT = 60
+
+FAKE_PARTICIPANT = "王大明"
+FAKE_TRANSCRIPT = "\n".join(
+    f"{FAKE_PARTICIPANT}：「我們在第 {i} 年開始推動數位轉型，過程並不容易。」"
+    for i in range(120)
+)
+
+
+def _fake_article() -> str:
+    """產生可通過 quality_check 的假文章"""
+    sections = [
+        f"## 第{i}段小標\n\n{FAKE_PARTICIPANT}說：「這是第 {i} 則引言。」" + "轉型的細節與觀察。" * 45
+        for i in range(1, 6)
+    ]
+    return "# 數位轉型的下一步\n\n" + "\n\n".join(sections)
+
+
+class FakeOpenAIServer:
+    """
+    本機假 OpenAI 端點（/v1/chat/completions）
+
+    - 回應延遲服從對數常態分布
+    - 以 Semaphore 限制同時處理數，並記錄每個請求的排隊時間
+    """
+
+    def __init__(self, latency: float, sigma: float, capacity: int):
+        self.latency = latency
+        self.sigma = sigma
+        self.slots = threading.Semaphore(capacity)
+        self.queue_delays: list[float] = []
+        self.lock = threading.Lock()
+        self.article = _fake_article()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                arrived = time.perf_counter()
+                with fake.slots:
+                    with fake.lock:
+                        fake.queue_delays.append(time.perf_counter() - arrived)
+                    time.sleep(random.lognormvariate(0, fake.sigma) * fake.latency)
+
+                content = fake.article if "撰寫" in body["messages"][-1]["content"] else "摘要內容"
+                payload = json.dumps({
+                    "id": "fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def drain_queue_delays(self) -> list[float]:
+        with self.lock:
+            delays, self.queue_delays = self.queue_delays, []
+        return delays
+
+
+class StreamlitServer:
+    """
+    以子行程執行真正的 `streamlit run app/ui_public.py`
+
+    所有虛擬使用者都連到同一個伺服器，與正式部署相同：共用一個行程、一個 GIL，
+    每個工作階段的腳本在伺服器的執行緒中執行。
+    """
+
+    def __init__(self, fake_base_url: str, verbose: bool = False):
+        self.port = _free_port()
+        self.workdir = tempfile.TemporaryDirectory(prefix="load_test_")
+        secrets = Path(self.workdir.name) / "secrets.toml"
+        secrets.write_text('OPENAI_API_KEY = "sk-load-test"\n', encoding="utf-8")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", str(APP_PATH),
+                "--server.headless", "true",
+                "--server.address", "127.0.0.1",
+                "--server.port", str(self.port),
+                "--server.fileWatcherType", "none",
+                "--secrets.files", str(secrets),
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "OPENAI_BASE_URL": fake_base_url},
+            stdout=None if verbose else subprocess.DEVNULL,
+            stderr=None if verbose else subprocess.DEVNULL,
+        )
+
+    @property
+    def stream_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout: float = SERVER_START_TIMEOUT) -> None:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Streamlit 伺服器啟動失敗（結束碼 {self.process.returncode}）")
+            try:
+                with urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("Streamlit 伺服器啟動逾時")
+
+    def rss_mb(self) -> float:
+        """伺服器行程目前的常駐記憶體（Linux /proc）"""
+        with open(f"/proc/{self.process.pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.workdir.cleanup()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class VirtualUser:
+    """
+    一位瀏覽器使用者：以 websocket 與伺服器交換 BackMsg／ForwardMsg
+
+    依標籤找出元件 id，送出元件狀態觸發重新執行，直到腳本執行完畢。
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.conn = None
+        self.widgets: dict[str, str] = {}       # 標籤 → 元件 id
+        self.states: dict[str, WidgetState] = {}
+        self.alerts: list[str] = []
+        self.exceptions: list[str] = []
+
+    async def connect(self) -> None:
+        self.conn = await websocket_connect(self.url)
+        await self.rerun()
+
+    async def rerun(self, trigger: str | None = None) -> None:
+        """送出目前的元件狀態（trigger 為要點擊的按鈕標籤），等待腳本執行完畢"""
+        msg = BackMsg()
+        states = list(self.states.values())
+        if trigger is not None:
+            click = WidgetState(id=self.widgets[trigger], trigger_value=True)
+            states.append(click)
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+
+        self.alerts, self.exceptions = [], []
+        while True:
+            raw = await self.conn.read_message()
+            if raw is None:
+                raise RuntimeError("websocket 連線中斷")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._collect(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def _collect(self, element) -> None:
+        kind = element.WhichOneof("type")
+        value = getattr(element, kind)
+        if kind == "alert":
+            self.alerts.append(value.body)
+        elif kind == "exception":
+            self.exceptions.append(f"{value.type}: {value.message}")
+        elif getattr(value, "id", "") and getattr(value, "label", ""):
+            self.widgets[value.label] = value.id
+
+    def set_text(self, label: str, value: str) -> None:
+        widget_id = self.widgets[label]
+        self.states[label] = WidgetState(id=widget_id, string_value=value)
+
+    def set_checkbox(self, label: str, value: bool) -> None:
+        widget_id = self.widgets[label]
+        self.states[label] = WidgetState(id=widget_id, bool_value=value)
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+
+async def open_session(url: str) -> VirtualUser:
+    """連線並填好生成表單（尚未按下生成）"""
+    user = VirtualUser(url)
+    await user.connect()
+    user.set_text("主題 *", "數位轉型")
+    user.set_text("企業／組織名稱 *", "台灣科技公司")
+    user.set_text("每行一位（姓名／職稱／權重）", f"{FAKE_PARTICIPANT}／執行長／1")
+    user.set_text("逐字稿內容 *", FAKE_TRANSCRIPT)
+    # 假文章不可寫入真正的文章庫
+    user.set_checkbox("🗄️ 保存至文章庫", False)
+    await user.rerun()
+    return user
+
+
+async def run_session(user: VirtualUser) -> float:
+    """按下生成並等待畫面完成，回傳端到端延遲秒數"""
+    start = time.perf_counter()
+    await user.rerun(trigger="🚀 生成文章")
+    elapsed = time.perf_counter() - start
+    if user.exceptions or not any("生成完成" in alert for alert in user.alerts):
+        raise RuntimeError(f"生成失敗：{user.exceptions or user.alerts}")
+    return elapsed
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _run_stage(users: int, fake: FakeOpenAIServer, server: StreamlitServer) -> dict:
+    sessions = await asyncio.gather(*(open_session(server.stream_url) for _ in range(users)))
+    rss_before = server.rss_mb()
+    fake.drain_queue_delays()
+
+    # 所有使用者同時按下生成
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run_session(s) for s in sessions), return_exceptions=True)
+    wall = time.perf_counter() - start
+    rss_after = server.rss_mb()
+
+    latencies, failures = [], 0
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            failures += 1
+            print(f"⚠️ {outcome}", file=sys.stderr)
+        else:
+            latencies.append(outcome)
+    for session in sessions:
+        await session.close()
+
+    queue = fake.drain_queue_delays()
+    return {
+        "users": users,
+        "ok": len(latencies),
+        "failed": failures,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "queue_p50": percentile(queue, 50),
+        "queue_p95": percentile(queue, 95),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mem_per_session_mb": max(0.0, rss_after - rss_before) / users,
+        "server_rss_mb": rss_after,
+    }
+
+
+def run_stage(users: int, fake: FakeOpenAIServer, server: StreamlitServer) -> dict:
+    """users 位使用者同時連到同一個伺服器，各執行一次生成流程"""
+    return asyncio.run(_run_stage(users, fake, server))
+
+
+def print_report(results: list[dict]) -> None:
+    header = (f"{'users':>5} {'ok':>4} {'fail':>4} {'thr/s':>7} {'queue50':>8} {'queue95':>8} "
+              f"{'p50':>7} {'p95':>7} {'p99':>7} {'MB/sess':>8} {'RSS MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['users']:>5} {r['ok']:>4} {r['failed']:>4} {r['throughput']:>7.2f} "
+              f"{r['queue_p50']:>8.2f} {r['queue_p95']:>8.2f} "
+              f"{r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} {r['mem_per_session_mb']:>8.1f} "
+              f"{r['server_rss_mb']:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ui_public 同時使用者壓力測試")
+    parser.add_argument("--users", default=DEFAULT_USERS, help="各階段同時使用者數，以逗號分隔")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="假端點延遲中位數（秒）")
+    parser.add_argument("--sigma", type=float, default=DEFAULT_SIGMA, help="延遲分布離散程度")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="假端點同時處理上限")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    parser.add_argument("--verbose", action="store_true", help="顯示 Streamlit 伺服器的執行紀錄")
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(args.latency, args.sigma, args.capacity)
+    fake.start()
+    server = StreamlitServer(fake.base_url, args.verbose)
+
+    results = []
+    try:
+        server.wait_ready()
+        # 暖身：讓伺服器完成模組匯入與模板載入，避免計入第一階段
+        run_stage(1, fake, server)
+        for users in [int(u) for u in args.users.split(",") if u.strip()]:
+            print(f"🚦 測試 {users} 位同時使用者…", file=sys.stderr)
+            results.append(run_stage(users, fake, server))
+    finally:
+        server.stop()
+        fake.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()